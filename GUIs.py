@@ -1,11 +1,41 @@
 import pygame
+import sys
+from collections import OrderedDict
 from settings import *
-from accounts import UserData
+from assets import assets
+
+
+# Fonts and rendered text shared by every page, most text is the same from one frame to the next
+class TextCache:
+    def __init__(self, max_size=TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self.fonts = {}  # (name, size) -> font, a system font lookup is only done once
+        self.surfaces = OrderedDict()  # (font name, size, text, colour) -> surface, least recently used first
+
+    def font(self, name, size):
+        font = self.fonts.get((name, size))
+        if font is None:
+            font = self.fonts[(name, size)] = pygame.font.SysFont(name, size)
+        return font
+
+    def render(self, name, size, text, colour):
+        key = (name, size, text, colour)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.surfaces[key] = self.font(name, size).render(text, True, colour)
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+
+text_cache = TextCache()  # one cache for the whole program
 
 
 class Button:
     def __init__(self, image_path, x, y):
-        self.image = pygame.image.load(image_path)  # load image
+        self.image = assets.image(image_path)  # shared with any other button using the same image
         self.rect = self.image.get_rect()  # returns rect object of the image
         self.rect.center = (x, y)  # sets position of the button center
 
@@ -26,24 +56,26 @@ class TextBox:
         self._user_text = ""  # text entry from user, private attribute
         self.active = False  # current active state of textbox
         self.rect = pygame.Rect(x, y, width, height)  # textbox rect object
-        self.font = pygame.font.SysFont("monospace", 30)  # text font
         self.char_limit = 27  # maximum number of text characters
         self.hide_text = hide_text  # boolean value for if text should be hidden
+        self.dirty = True  # textbox has changed since it was last drawn
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.rect.collidepoint(event.pos):  # check whether mouse click was on the box
-                self.active = True
-            else:
-                self.active = False
+            active = self.rect.collidepoint(event.pos)  # check whether mouse click was on the box
+            if active != self.active:
+                self.active = active
+                self.dirty = True
 
         elif event.type == pygame.KEYDOWN:
             if self.active:
                 if event.key == pygame.K_BACKSPACE:
                     self._user_text = self._user_text[:-1]  # pressing backspace removes a character
+                    self.dirty = True
                 # check if we are within the character limit
                 elif len(self._user_text) < self.char_limit:
                     self._user_text += event.unicode  # add character to the text
+                    self.dirty = True
 
     def draw(self, window):
         # Choose display conditions
@@ -56,14 +88,16 @@ class TextBox:
 
         # Display textbox
         pygame.draw.rect(window, color, self.rect)  # draws textbox as a rectangle
-        text_surface = self.font.render(text_output, True, "black")  # creates text surface
+        text_surface = text_cache.render("monospace", 30, text_output, "black")  # creates text surface
         window.blit(text_surface, (self.rect.x + 10, self.rect.y + 10))  # text surface displayed in textbox
+        self.dirty = False
 
     def get_text(self):
         return self._user_text
 
     def reset(self):
         self._user_text = ""
+        self.dirty = True
 
 
 class Page:
@@ -74,6 +108,10 @@ class Page:
     def draw_background(self, window):
         window.blit(self.background, (0, 0))
 
+    def redraw(self, window):
+        # Draws only the parts of the page that changed since it was last drawn and returns their rects
+        return []  # most pages never change while they are open
+
 
 class SignInPage(Page):
     def __init__(self):
@@ -85,14 +123,14 @@ class SignInPage(Page):
         self.registerBtn = Button("buttons/register.png", x=WINDOW_WIDTH / 2 - 150, y=500)
         self.signInBtn = Button("buttons/sign in.png", x=WINDOW_WIDTH / 2 + 150, y=500)
         # Load registration note
-        self.registration_note = pygame.image.load("registration note.png")
+        self.registration_note = assets.image("registration note.png")
         # Create page headings
-        heading_font = pygame.font.SysFont("Arial", 50)
-        self.username_heading = heading_font.render("Username", True, "black")
-        self.password_heading = heading_font.render("Password", True, "black")
+        self.username_heading = text_cache.render("Arial", 50, "Username", "black")
+        self.password_heading = text_cache.render("Arial", 50, "Password", "black")
         # Create variables for status message
-        self.message_font = pygame.font.SysFont("Arial", 40)  # font for status message
         self.status_message = ""  # message updating the user about register/login status
+        self.message_rect = pygame.Rect(270, 650, 0, 0)  # area covered by the message when it was last drawn
+        self.message_dirty = False
 
     def draw(self, window):
         self.draw_background(window)
@@ -123,13 +161,30 @@ class SignInPage(Page):
         self.passwordTxtBox.reset()
 
     def set_message(self, message):
-        self.status_message = message
+        if message != self.status_message:
+            self.status_message = message
+            self.message_dirty = True
 
     def display_message(self, window):
+        self.message_rect.size = (0, 0)
         if len(self.status_message) != 0:  # check that message is not an empty string
             # display status message
-            message_surface = self.message_font.render(self.status_message, True, "red")
-            window.blit(message_surface, (270, 650))
+            message_surface = text_cache.render("Arial", 40, self.status_message, "red")
+            self.message_rect = window.blit(message_surface, (270, 650))
+        self.message_dirty = False
+
+    def redraw(self, window):
+        changed = []
+        for textbox in (self.usernameTxtBox, self.passwordTxtBox):
+            if textbox.dirty:
+                textbox.draw(window)
+                changed.append(textbox.rect)
+        if self.message_dirty:
+            old_rect = self.message_rect.copy()
+            window.blit(self.background, old_rect, old_rect)  # cover the old message
+            self.display_message(window)
+            changed.append(old_rect.union(self.message_rect))
+        return changed
 
 
 class Menu(Page):
@@ -141,8 +196,7 @@ class Menu(Page):
         self.leaderboardBtn = Button("buttons/leaderboard.png", x=WINDOW_WIDTH / 2, y=500)
         self.signOutBtn = Button("buttons/sign out.png", x=120, y=670)
         # Create title
-        title_font = pygame.font.SysFont("algerian", 34)
-        self.title = title_font.render(GAME_TITLE, True, "red")
+        self.title = text_cache.render("algerian", 34, GAME_TITLE, "red")
 
     def draw(self, window):
         self.draw_background(window)
@@ -160,7 +214,7 @@ class Menu(Page):
 class ControlsPage(Page):
     def __init__(self):
         super().__init__()
-        self.image = pygame.transform.scale(pygame.image.load("controls.png"), (WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.image = assets.image("controls.png", (WINDOW_WIDTH, WINDOW_HEIGHT))
         self.backBtn = Button("buttons/back.png", x=50, y=30)
 
     def draw(self, window):
@@ -170,17 +224,29 @@ class ControlsPage(Page):
 
 
 class LeaderboardPage(Page):
-    def __init__(self):
+    # Table constants
+    TABLE_X, TABLE_Y = 100, 120
+    ROW_COLORS = ("white", "khaki1")
+    HEADERS = ("Rank", "Username", "Highscore")
+    ROW_WIDTH, ROW_HEIGHT = 900, 50
+    COL_WIDTH = ROW_WIDTH // len(HEADERS)
+
+    def __init__(self, userData):
         super().__init__()
         self.backBtn = Button("buttons/back.png", x=50, y=30)
-        self.userData = UserData()
-        self.leaderboard_list = self.userData.get_leaderboard()
+        self.userData = userData  # the application's database connection
 
         # Create title
-        title_font = pygame.font.SysFont("algerian", 45)
-        self.title = title_font.render("Leaderboard", True, "black")
+        self.title = text_cache.render("algerian", 45, "Leaderboard", "black")
+
+        # Table is drawn onto its own surface whenever the leaderboard changes
+        self.table = None
+        self.shown_version = None  # version of the leaderboard the table was built from
+        self.update()
 
     def draw(self, window):
+        if self.shown_version != self.userData.get_leaderboard_version():
+            self.update()
         self.draw_background(window)
         self.draw_title(window)
         self.draw_leaderboard(window)
@@ -190,56 +256,62 @@ class LeaderboardPage(Page):
         window.blit(self.title, (390, 50))
 
     def draw_leaderboard(self, window):
-        # Table constants
-        TABLE_X, TABLE_Y = 100, 120
-        ROW_COLORS = ("white", "khaki1")
-        HEADERS = ("Rank", "Username", "Highscore")
-        ROW_WIDTH, ROW_HEIGHT = 900, 50
-        COL_WIDTH = ROW_WIDTH // len(HEADERS)
-        HEADER_FONT = pygame.font.SysFont("Impact", 25)
-        NUM_ROWS = len(self.leaderboard_list) + 1  # rows for users plus the headers row
+        window.blit(self.table, (self.TABLE_X, self.TABLE_Y))
+
+    def build_table(self):
+        # Draw the whole table onto one surface, positions are relative to the top left of the table
+        num_rows = len(self.leaderboard_list) + 1  # rows for users plus the headers row
+        table = pygame.Surface((self.ROW_WIDTH + 1, self.ROW_HEIGHT * num_rows)).convert()
+        table.fill(BG_COLOUR)
 
         # Draw table rows
-        rows = [(TABLE_X, TABLE_Y + ROW_HEIGHT * i, ROW_WIDTH, ROW_HEIGHT) for i in range(NUM_ROWS)]
+        rows = [(0, self.ROW_HEIGHT * i, self.ROW_WIDTH, self.ROW_HEIGHT) for i in range(num_rows)]
         for i, row in enumerate(rows):
-            pygame.draw.rect(window, ROW_COLORS[i % 2], row)  # alternate between row colors
-            pygame.draw.line(window, "gold", (row[0], row[1]), (row[0] + row[2], row[1]))  # draw line to separate row
+            pygame.draw.rect(table, self.ROW_COLORS[i % 2], row)  # alternate between row colors
+            pygame.draw.line(table, "gold", (row[0], row[1]), (row[0] + row[2], row[1]))  # draw line to separate row
 
         # Draw table columns
-        cols = [(TABLE_X + COL_WIDTH * i, TABLE_Y, COL_WIDTH, ROW_HEIGHT * NUM_ROWS) for i in range(len(HEADERS) + 1)]
-        for col in cols:
-            pygame.draw.line(window, "gold", (col[0], col[1]), (col[0], col[1] + col[3]))  # draw line to separate col
+        for i in range(len(self.HEADERS) + 1):
+            x = self.COL_WIDTH * i
+            pygame.draw.line(table, "gold", (x, 0), (x, self.ROW_HEIGHT * num_rows))  # draw line to separate col
 
         # Draw headers
-        for i, header in enumerate(HEADERS):
-            text = HEADER_FONT.render(header, True, "black")
-            window.blit(text, (TABLE_X + 10 + COL_WIDTH * i, TABLE_Y + 10))
+        for i, header in enumerate(self.HEADERS):
+            table.blit(text_cache.render("Impact", 25, header, "black"), (10 + self.COL_WIDTH * i, 10))
 
-        # Draw leaderboard rows
+        # Draw leaderboard rows, each row's text is only needed once so it doesn't go through the text cache
+        font = text_cache.font("Impact", 25)
         for i, (username, highscore) in enumerate(self.leaderboard_list):
-            username_text = HEADER_FONT.render(username, True, "black")
-            highscore_text = HEADER_FONT.render(str(highscore), True, "black")
-            rank_text = HEADER_FONT.render(str(i + 1), True, "black")
-            x = TABLE_X + 10
-            y = TABLE_Y + 10 + ROW_HEIGHT + ROW_HEIGHT * i  # first row is left for the headers
-            window.blit(rank_text, (x, y))
-            window.blit(username_text, (x + COL_WIDTH, y))
-            window.blit(highscore_text, (x + COL_WIDTH * 2, y))
+            y = 10 + self.ROW_HEIGHT + self.ROW_HEIGHT * i  # first row is left for the headers
+            for col, text in enumerate((str(i + 1), username, str(highscore))):
+                table.blit(font.render(text, True, "black"), (10 + self.COL_WIDTH * col, y))
+        return table
 
     def update(self):
         self.leaderboard_list = self.userData.get_leaderboard()  # get updated leaderboard
+        self.shown_version = self.userData.get_leaderboard_version()
+        self.table = self.build_table()
+
+    def redraw(self, window):
+        # A new highscore since the page was opened replaces the table
+        if self.shown_version == self.userData.get_leaderboard_version():
+            return []
+        old_rect = self.table.get_rect(topleft=(self.TABLE_X, self.TABLE_Y))
+        self.update()
+        window.blit(self.background, old_rect, old_rect)
+        self.draw_leaderboard(window)
+        return [old_rect.union(self.table.get_rect(topleft=(self.TABLE_X, self.TABLE_Y)))]
 
 
 class PlayerGUI:
     def __init__(self, player):
         self.player = player
-        self.font = pygame.font.SysFont("Impact", 14)  # text font
         self.healthbar = pygame.Rect(WINDOW_WIDTH - MAX_PLAYER_HEALTH * 2 - 20, 10, self.player.health * 2, 20)
-        self.ammo_icon = pygame.image.load("icons/ammo.png").convert_alpha()
+        self.ammo_icon = assets.image("icons/ammo.png")
         self.weapon_icons = {
-            "pistol": pygame.image.load("icons/pistol.png").convert_alpha(),
-            "shotgun": pygame.image.load("icons/shotgun.png").convert_alpha(),
-            "assault rifle": pygame.image.load("icons/assault rifle.png").convert_alpha(),
+            "pistol": assets.image("icons/pistol.png"),
+            "shotgun": assets.image("icons/shotgun.png"),
+            "assault rifle": assets.image("icons/assault rifle.png"),
         }
 
     def draw(self, window):
@@ -269,62 +341,125 @@ class PlayerGUI:
             if i < len(self.player.inventory):
                 weapon = self.player.inventory[i]
                 weapon_icon = self.weapon_icons[weapon.name]  # retrieve icon image from dictionary
-                ammo_text_surface = self.font.render(f"x{weapon.ammo}", True, "black")   # create text for weapon ammo
+                ammo_text_surface = text_cache.render("Impact", 14, f"x{weapon.ammo}", "black")  # text for weapon ammo
                 window.blit(ammo_text_surface, (box_x + 20, box_y + 40))  # display ammo text within the box
             else:
-                weapon_icon = self.font.render("Empty", True, "red")   # icon set as text surface with string "Empty"
+                weapon_icon = text_cache.render("Impact", 14, "Empty", "red")  # icon set as text surface "Empty"
             window.blit(weapon_icon, (box_x + 5, box_y + 20))  # display icon inside inventory box
 
     def draw_ammo(self, window):
         window.blit(self.ammo_icon, (990, 670))
-        text_surface = self.font.render(f"x{self.player.ammo}", True, "black")
+        text_surface = text_cache.render("Impact", 14, f"x{self.player.ammo}", "black")
         # display text next to ammo icon
         window.blit(text_surface, (995 + self.ammo_icon.get_width(), 670 + self.ammo_icon.get_height()//2))
 
 
+# Frame timing stats shown over the game while the profiler is on
+class ProfilerOverlay:
+    def __init__(self, game):
+        self.game = game  # the profiler is kept by the game across dungeons
+        self.font = text_cache.font("monospace", 14)
+        self.surface = None  # text is only rendered again every PROFILE_REFRESH frames
+        self.last_refresh = None
+
+    def draw(self, window):
+        frame_num = self.game.profiler.frame_num
+        if self.last_refresh is None or not 0 <= frame_num - self.last_refresh < PROFILE_REFRESH:
+            self.refresh(self.game.profiler)
+            self.last_refresh = frame_num
+        window.blit(self.surface, (10, 40))
+
+    def refresh(self, profiler):
+        lines = [f"{'ms':<12}{'p50':>7}{'p95':>7}{'p99':>7}"]
+        for phase, (p50, p95, p99) in profiler.stats().items():
+            lines.append(f"{phase:<12}{p50:>7.2f}{p95:>7.2f}{p99:>7.2f}")
+        lines += [f"{key:<16}{value:>10}" for key, value in profiler.latest_counts().items()]
+
+        # All lines are drawn onto one translucent panel
+        line_height = self.font.get_linesize()
+        text_surfaces = [self.font.render(line, True, "white") for line in lines]
+        width = max(surface.get_width() for surface in text_surfaces) + 10
+        self.surface = pygame.Surface((width, line_height * len(lines) + 10), pygame.SRCALPHA)
+        self.surface.fill((0, 0, 0, 160))
+        for i, text_surface in enumerate(text_surfaces):
+            self.surface.blit(text_surface, (5, 5 + i * line_height))
+
+
 # Game Heads Up Display
 class GameHUD:
     def __init__(self, game):
         self.game = game
         self.playerGUI = PlayerGUI(self.game.player)
-        self.font = pygame.font.SysFont("Impact", 18)
+        self.profilerOverlay = ProfilerOverlay(self.game)
 
     def draw(self, window):
         self.playerGUI.draw(window)
         # Display current level and player score
-        level_text = self.font.render(f"Level: {self.game.level}", True, "red")
-        score_text = self.font.render(f"Score: {self.game.player_score}", True, "red")
+        level_text = text_cache.render("Impact", 18, f"Level: {self.game.level}", "red")
+        score_text = text_cache.render("Impact", 18, f"Score: {self.game.player_score}", "red")
         window.blit(level_text, (10, 10))
         window.blit(score_text, (90, 10))
+        # Frame timing overlay
+        if self.game.profiler.enabled:
+            self.profilerOverlay.draw(window)
 
 
 class ScreenTransitions:
+    NEW_DUNGEON_TIME = 2000  # shortest time in milliseconds each screen is shown for
+    GAME_OVER_TIME = 2500
+    DOT_TIME = 300  # milliseconds between each dot added to the new dungeon message
+
     def __init__(self):
-        self.font = pygame.font.SysFont("Impact", 55)
         self.background = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
         self.background.set_alpha(100)
+        self.clock = pygame.time.Clock()
 
     def game_over(self, window, score):
         # Display background messages
-        game_over_message = self.font.render("Game Over", True, "red")
-        score_message = self.font.render(f"Score: {score}", True, "red")
+        game_over_message = text_cache.render("Impact", 55, "Game Over", "red")
+        score_message = text_cache.render("Impact", 55, f"Score: {score}", "red")
         window.blit(self.background, (0, 0))
         window.blit(game_over_message, (425, 250))
         window.blit(score_message, (435, 350))
 
-        # Update display and wait for 2.5 seconds
+        # Update display and show it for 2.5 seconds
         pygame.mouse.set_visible(True)
         pygame.display.update()
-        pygame.time.wait(2500)
+        start = pygame.time.get_ticks()
+        while pygame.time.get_ticks() - start < self.GAME_OVER_TIME:
+            self.handle_events()
 
-    def new_dungeon(self, window):
-        # Display background and message
+    def new_dungeon(self, window, ready=lambda: True):
+        # Animated until the minimum time has passed and ready() is True, the window keeps handling events throughout
         window.blit(self.background, (0, 0))
-        message = self.font.render("Regenerating Dungeon...", True, "black")
-        window.blit(message, (250, 300))
-
-        # Update display and wait for 2 seconds
         pygame.mouse.set_visible(True)
         pygame.display.update()
-        pygame.time.wait(2000)
+        frame = window.copy()  # dimmed game frame, the message is redrawn on top of it
+
+        message_pos = (250, 300)
+        message_area = text_cache.render("Impact", 55, "Regenerating Dungeon...", "black").get_rect(topleft=message_pos)
+        bar = pygame.Rect(message_area.left, message_area.bottom + 20, message_area.width, 10)
+        start = pygame.time.get_ticks()
+        while True:
+            elapsed = pygame.time.get_ticks() - start
+            if elapsed >= self.NEW_DUNGEON_TIME and ready():
+                break
+            # Message gains a dot at a time and the bar fills up over the minimum time
+            dots = "." * (elapsed // self.DOT_TIME % 4)
+            window.blit(frame, message_area, message_area)
+            window.blit(text_cache.render("Impact", 55, "Regenerating Dungeon" + dots, "black"), message_pos)
+            pygame.draw.rect(window, "black", bar, 1)
+            progress = bar.inflate(-4, -4)
+            progress.width = progress.width * min(elapsed, self.NEW_DUNGEON_TIME) // self.NEW_DUNGEON_TIME
+            pygame.draw.rect(window, "red", progress)
+            pygame.display.update([message_area, bar])
+            self.handle_events()
         pygame.mouse.set_visible(False)
+
+    def handle_events(self):
+        # Window stays responsive while a screen is shown, anything other than quitting is ignored
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        self.clock.tick(MENU_FPS)
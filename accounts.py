@@ -1,16 +1,122 @@
 import sqlite3
 import hashlib
+import atexit
+import threading
+import time
+from queue import Queue, Empty
+from concurrent.futures import Future
 from datetime import datetime
 
 
+# Every change to the database is made by a background thread, commits never hold up the game or the pages
+# Writes waiting in the queue are committed together, and retried if another process has the database locked
+class WriteBehindQueue:
+    BATCH_SIZE = 64  # most writes committed in one transaction
+    RETRIES = 5  # attempts at committing a batch while the database is busy
+    RETRY_DELAY = 0.05  # seconds before the first retry, doubled after each attempt
+
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock  # held while the connection is in use, it is shared with the reads
+        self.queue = Queue()  # (statements, future) of every write, None to stop
+        self.commits = 0  # transactions committed
+        self.thread = threading.Thread(target=self.run, name="database writer", daemon=True)
+        self.thread.start()
+
+    def write(self, *statements):
+        # Queues (sql, parameters) statements run together, the future gives the row id of the last one
+        future = Future()
+        self.queue.put((statements, future))
+        return future
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]  # waits for the next write
+            while batch[-1] is not None and len(batch) < WriteBehindQueue.BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())  # writes queued since then join the same transaction
+                except Empty:
+                    break
+            stop = batch[-1] is None
+            writes = [write for write in batch if write is not None]
+            if writes:
+                self.commit(writes)
+            if stop:
+                return
+
+    def commit(self, writes):
+        delay = WriteBehindQueue.RETRY_DELAY
+        for attempt in range(WriteBehindQueue.RETRIES):
+            with self.lock:
+                results, error = self.try_commit(writes)
+            # SQLITE_BUSY, another connection to the file is writing, try again after a while
+            if error is None or not str(error).startswith("database is locked"):
+                break
+            if attempt < WriteBehindQueue.RETRIES - 1:
+                time.sleep(delay)
+                delay *= 2
+
+        for future, result, write_error in results:
+            if write_error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(write_error)
+
+    def try_commit(self, writes):
+        # Runs every write in one transaction, returns (future, row id, error) of each write and any commit error
+        results = []
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE;")  # takes the write lock now, a busy database fails here and is retried
+            for statements, future in writes:
+                # Each write has its own savepoint, a failed write is undone without undoing the rest of the batch
+                cursor.execute("SAVEPOINT write;")
+                try:
+                    for sql, parameters in statements:
+                        cursor.execute(sql, parameters)
+                    row_id = cursor.lastrowid
+                    cursor.execute("RELEASE write;")
+                    results.append((future, row_id, None))
+                except sqlite3.IntegrityError as error:
+                    # Only this write fails, e.g. a taken username, along with any of its statements that ran
+                    cursor.execute("ROLLBACK TO write;")
+                    cursor.execute("RELEASE write;")
+                    results.append((future, None, error))
+            self.conn.commit()
+            self.commits += 1
+        except sqlite3.Error as error:
+            # Any other error fails the whole batch, the thread carries on with the next one
+            try:
+                self.conn.rollback()
+            except sqlite3.Error:
+                pass  # nothing left to roll back, e.g. the connection is closed
+            return [(future, None, error) for _, future in writes], error
+        return results, None
+
+    def close(self):
+        # Commits everything still queued and stops the thread
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+
 class UserData:
-    def __init__(self):
-        # Database connection
-        self.conn = sqlite3.connect("userdata.db")
+    LEADERBOARD_SIZE = 10  # users shown on the leaderboard, kept in memory once read
+
+    def __init__(self, path="userdata.db"):
+        # One database connection for the whole program, shared by the pages and the writer thread
+        self.conn = sqlite3.connect(path, timeout=1, check_same_thread=False)
+        self.lock = threading.Lock()
         self.cursor = self.conn.cursor()
 
+        # Write ahead log, readers don't wait for writers and commits don't wait for the disk
+        self.cursor.execute("PRAGMA journal_mode = WAL;")
+        self.cursor.execute("PRAGMA synchronous = NORMAL;")
+        self.cursor.execute("PRAGMA temp_store = MEMORY;")
+        self.cursor.execute("PRAGMA cache_size = -8000;")  # 8 MB page cache
+
         # Create user and highscore tables if not already made
-        self.cursor.execute(""" 
+        self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS Users(
                 user_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 username TEXT NOT NULL UNIQUE,
@@ -27,21 +133,48 @@ class UserData:
                 FOREIGN KEY (user_id) REFERENCES Users(user_id)
             );
         """)
+        # Leaderboard order straight from an index, it holds every column the leaderboard needs from Highscores
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS HighscoresRanking
+            ON Highscores(highscore DESC, score_date ASC, score_time ASC, user_id);
+        """)
+        # Each user's highscore is looked up whenever a game ends
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS HighscoresUser ON Highscores(user_id);")
         # Commit database changes
         self.conn.commit()
         self.current_user = None  # no user currently logged in
+        self.current_username = None
+
+        # Top of the leaderboard as (username, highscore, score date, score time, user id), None until it is first read
+        # New highscores are patched in as they are queued, so the database is only read once
+        # The cached leaderboard and its version are only changed by the main thread, the writer thread only counts
+        # failed saves under the lock and the main thread reads the leaderboard again when the count changes
+        self.leaderboard = None
+        self.leaderboard_version = 0  # changes whenever the leaderboard changes
+        self.unsaved_scores = []  # scores still waiting in the write queue, added to the leaderboard when it is read
+        self.failed_saves = 0  # highscores the writer couldn't save
+        self.seen_failed_saves = 0  # failed saves already dropped from the cached leaderboard
+
+        # Later changes go through the write behind queue, anything still queued is committed when the program exits
+        self.writer = WriteBehindQueue(self.conn, self.lock)
+        atexit.register(self.close)
+
+    def close(self):
+        # Queued writes are committed before the connection is closed
+        self.writer.close()
+        self.conn.close()
 
     def create_user(self, username, password):
         # Hash password and obtain hex equivalent
         password = hashlib.sha256(password.encode()).hexdigest()
-        # Attempts to create a new user account
-        try:
-            self.cursor.execute("""
-                INSERT INTO Users(username, password) 
-                VALUES(?, ?);
-            """, (username, password))
-            self.conn.commit()
+        # Attempts to create a new user account, waits for the writer as the page needs to know if it worked
+        future = self.writer.write(("""
+            INSERT INTO Users(username, password) 
+            VALUES(?, ?);
+        """, (username, password)))
         # Return True or False depending on if username is already taken
+        try:
+            future.result()
         except sqlite3.IntegrityError:
             return False
         return True
@@ -73,16 +206,18 @@ class UserData:
     def check_login(self, username, password):
         password = hashlib.sha256(password.encode()).hexdigest()
         # Check for matching record in Users table
-        self.cursor.execute("""
-            SELECT user_id
-            FROM Users 
-            WHERE username = ? AND password = ?;
-         """, (username, password))
-        # fetch query result
-        result = self.cursor.fetchone()
+        with self.lock:
+            self.cursor.execute("""
+                SELECT user_id
+                FROM Users 
+                WHERE username = ? AND password = ?;
+             """, (username, password))
+            # fetch query result
+            result = self.cursor.fetchone()
         # return True or False depending on if there is a match
         if result is not None:
             self.current_user = result[0]  # set as current user
+            self.current_username = username
             return True
         return False
 
@@ -96,40 +231,80 @@ class UserData:
         score_date = now.strftime("%Y-%m-%d")
         score_time = now.strftime("%H:%M:%S")
 
-        # Check for existing highscore
-        self.cursor.execute("""
-            SELECT highscore
-            FROM Highscores
-            WHERE user_id = ?;
-        """, (self.current_user,))
-        current_highscore = self.cursor.fetchone()
-
-        # First ever highscore
-        if current_highscore is None:
-            self.cursor.execute("""
-                INSERT INTO Highscores(highscore, score_date, score_time, user_id)
-                VALUES (?, ?, ?, ?)
-            """, (score, score_date, score_time, self.current_user))
-            self.conn.commit()
-        # New highscore
-        elif score > current_highscore[0]:
-            self.cursor.execute("""
-                UPDATE Highscores
-                SET highscore = ?,
-                    score_date = ?,
-                    score_time = ?
-                WHERE user_id = ?;
-            """, (score, score_date, score_time, self.current_user))
-            self.conn.commit()
+        # Raise the existing highscore, or add the first ever highscore, the game doesn't wait for either
+        future = self.writer.write(("""
+            UPDATE Highscores
+            SET highscore = ?,
+                score_date = ?,
+                score_time = ?
+            WHERE user_id = ? AND highscore < ?;
+        """, (score, score_date, score_time, self.current_user, score)), ("""
+            INSERT INTO Highscores(highscore, score_date, score_time, user_id)
+            SELECT ?, ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM Highscores WHERE user_id = ?);
+        """, (score, score_date, score_time, self.current_user, self.current_user)))
+        entry = (self.current_username, score, score_date, score_time, self.current_user)
+        self.unsaved_scores.append(entry)
+        future.add_done_callback(lambda future: self.check_saved(future, entry))
+        if self.leaderboard is not None and self.patch_leaderboard(self.leaderboard, entry):
+            self.leaderboard_version += 1
+
+    def patch_leaderboard(self, leaderboard, new_entry):
+        # Adds a score to a leaderboard list if it makes it into the top, returns True if the list changed
+        rank_key = lambda entry: (-entry[1], entry[2], entry[3], entry[4])  # same order as the leaderboard query
+        for i, entry in enumerate(leaderboard):
+            if entry[4] == new_entry[4]:
+                if new_entry[1] <= entry[1]:
+                    return False  # not a new highscore
+                del leaderboard[i]
+                break
+        else:
+            # Leaderboard only has room for someone new if it is not full or the score beats the last place
+            # A user outside the top can't have a highscore above the last place, so their old score doesn't matter
+            if len(leaderboard) >= UserData.LEADERBOARD_SIZE and rank_key(new_entry) >= rank_key(leaderboard[-1]):
+                return False
+        leaderboard.append(new_entry)
+        leaderboard.sort(key=rank_key)
+        del leaderboard[UserData.LEADERBOARD_SIZE:]
+        return True
+
+    def check_saved(self, future, entry):
+        # Runs on the writer thread, a score that couldn't be saved is dropped by the main thread
+        with self.lock:
+            self.unsaved_scores.remove(entry)
+            if future.exception() is not None:
+                self.failed_saves += 1
+
+    def get_leaderboard_version(self):
+        # A failed save changes the version, so pages showing the leaderboard read it again
+        failed_saves = self.failed_saves
+        if failed_saves != self.seen_failed_saves:
+            self.seen_failed_saves = failed_saves
+            self.leaderboard = None
+            self.leaderboard_version += 1
+        return self.leaderboard_version
 
     def get_leaderboard(self):
         # Retrieve username and highscore of top 10 users and return as list
-        self.cursor.execute("""
-            SELECT Users.username, Highscores.highscore
-            From Users
-            JOIN Highscores ON Users.user_id = Highscores.user_id
-            ORDER BY Highscores.highscore DESC, Highscores.score_date ASC, Highscores.score_time ASC
-            LIMIT 10;
-        """)
-        leaderboard_list = self.cursor.fetchall()
-        return leaderboard_list
+        self.get_leaderboard_version()  # drops the cached leaderboard if a save failed
+        leaderboard = self.leaderboard
+        if leaderboard is None:
+            with self.lock:
+                self.cursor.execute("""
+                    SELECT Users.username, Highscores.highscore, Highscores.score_date, Highscores.score_time,
+                           Highscores.user_id
+                    From Highscores
+                    JOIN Users ON Users.user_id = Highscores.user_id
+                    ORDER BY Highscores.highscore DESC, Highscores.score_date ASC, Highscores.score_time ASC,
+                             Highscores.user_id ASC
+                    LIMIT ?;
+                """, (UserData.LEADERBOARD_SIZE,))
+                leaderboard = self.cursor.fetchall()
+                # Taken with the query, the writer only drops a score from unsaved_scores under this lock after
+                # committing it, so every score is either in the query or in the snapshot
+                unsaved_scores = list(self.unsaved_scores)
+            # Scores not committed yet are missing from the query, patching in a saved score changes nothing
+            for entry in unsaved_scores:
+                self.patch_leaderboard(leaderboard, entry)
+            self.leaderboard = leaderboard
+        return [(entry[0], entry[1]) for entry in leaderboard]
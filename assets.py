@@ -0,0 +1,65 @@
+import pygame
+import numpy as np
+
+
+# Every image used by the program, each file is decoded once and converted to the display's pixel format once
+class AssetManager:
+    def __init__(self):
+        self.files = {}  # path -> decoded image, as loaded from disk
+        self.surfaces = {}  # (path, size) -> scaled and converted surface handed out to the game
+        self.hits = 0
+        self.misses = 0
+        self.file_loads = 0  # images decoded from disk
+        self.pending = {}  # path -> future of an image being decoded by a background thread
+
+    def image(self, path, size=None):
+        # Shared surface for the image at "path", optionally scaled to "size", must not be drawn on
+        key = (path, size)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+
+        surface = self.load(path)
+        if size is not None:
+            surface = pygame.transform.scale(surface, size)
+        # Images without transparent pixels are converted without alpha, which makes blitting them faster
+        if self.is_opaque(surface):
+            surface = surface.convert()
+        else:
+            surface = surface.convert_alpha()
+        self.surfaces[key] = surface
+        return surface
+
+    def load(self, path):
+        surface = self.files.get(path)
+        if surface is None:
+            future = self.pending.pop(path, None)
+            if future is not None:
+                surface = future.result()  # waits if the image is still being decoded
+            else:
+                surface = pygame.image.load(path)
+            self.files[path] = surface
+            self.file_loads += 1
+        return surface
+
+    def preload(self, paths, executor):
+        # Decodes images on the executor's threads so they are ready before they are first used
+        # Only decoding happens in the background, scaling and converting are left to the main thread
+        for path in paths:
+            if path not in self.files and path not in self.pending:
+                self.pending[path] = executor.submit(pygame.image.load, path)
+
+    @staticmethod
+    def is_opaque(surface):
+        if surface.get_flags() & pygame.SRCALPHA:
+            return bool(np.all(pygame.surfarray.pixels_alpha(surface) == 255))
+        return surface.get_colorkey() is None
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "file_loads": self.file_loads, "surfaces": len(self.surfaces),
+                "pending": len(self.pending)}
+
+
+assets = AssetManager()  # one manager for the whole program
@@ -0,0 +1,81 @@
+# Microbenchmark of the A* engine against the original list copying implementation
+# Run from the project folder with: python -m benchmarks.astar
+import heapq
+import random
+import time
+from settings import *
+from gameobjects import Map
+from pathfinding import AStar, PathCache
+
+NUM_MAPS = 5
+QUERIES_PER_MAP = 200
+MAX_LEGACY_POPS = 50000  # the original search can blow up on some maps, so it gives up after this many pops
+
+
+def legacy_calculate_path(graph, start, goal):
+    # Original Enemy.calculate_path search, kept for comparison, returns None if it gave up
+    def heuristic(coord1, coord2):
+        x1, y1 = coord1
+        x2, y2 = coord2
+        return abs(x1 - x2) + abs(y1 - y2)
+
+    heap = [(0, start, [])]
+    visited = set()
+    pops = 0
+    while heap and pops < MAX_LEGACY_POPS:
+        pops += 1
+        current_f_score, current_node, path = heapq.heappop(heap)
+        if current_node == goal:
+            return path + [current_node]
+        current_g_score = current_f_score - heuristic(current_node, goal)
+        for neighbor in graph[current_node]:
+            if neighbor not in visited:
+                g_score = current_g_score + 1
+                f_score = g_score + heuristic(neighbor, goal)
+                heapq.heappush(heap, (f_score, neighbor, path + [current_node]))
+        visited.add(current_node)
+
+
+def random_walk(graph, node, steps):
+    # Goal positions of a player walking around the map one tile at a time
+    walk = [node]
+    for _ in range(steps):
+        node = random.choice(graph[node])
+        walk.append(node)
+    return walk
+
+
+def time_calls(function, args_list):
+    start = time.perf_counter()
+    for args in args_list:
+        function(*args)
+    return (time.perf_counter() - start) / len(args_list) * 1000  # milliseconds per call
+
+
+def main():
+    random.seed(0)
+    print(f"{'map':>4} {'nodes':>6} {'legacy ms':>10} {'astar ms':>9} {'speedup':>8} {'cached ms':>10} {'gave up':>8}")
+    for map_num in range(NUM_MAPS):
+        map = Map(BASE_MAP_WIDTH, BASE_MAP_HEIGHT)  # original dungeon size
+        astar = AStar(map)
+        nodes = list(map.graph)
+        pairs = [(random.choice(nodes), random.choice(nodes)) for _ in range(QUERIES_PER_MAP)]
+
+        legacy_paths = []
+        legacy_ms = time_calls(lambda start, goal: legacy_paths.append(legacy_calculate_path(map.graph, start, goal)),
+                               pairs)
+        gave_up = legacy_paths.count(None)
+        astar_ms = time_calls(lambda start, goal: astar.search(map.tile_id(start), map.tile_id(goal)), pairs)
+
+        # Enemy standing still while the player walks away, the cached path is repaired instead of searched again
+        path_cache = PathCache(astar)
+        start = map.tile_id(pairs[0][0])
+        walk = [(start, map.tile_id(goal)) for goal in random_walk(map.graph, pairs[0][1], QUERIES_PER_MAP)]
+        cached_ms = time_calls(path_cache.get_path, walk)
+
+        print(f"{map_num:>4} {len(nodes):>6} {legacy_ms:>10.3f} {astar_ms:>9.3f} {legacy_ms / astar_ms:>7.1f}x "
+              f"{cached_ms:>10.4f} {gave_up:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Leaderboard query and highscore update latency with a large number of accounts
+# Run from the project folder with: python -m benchmarks.leaderboard [--users 1000000]
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from accounts import UserData
+
+USERS = 1000000
+RUNS = 20
+
+
+def fill_database(userData, num_users, seed=0):
+    # Every user gets a highscore, dates and times are spread over a year so ties are broken by them
+    rng = random.Random(seed)
+    conn = userData.conn
+    conn.executemany("INSERT INTO Users(user_id, username, password) VALUES (?, ?, ?);",
+                     ((i, f"user{i}", "x" * 64) for i in range(1, num_users + 1)))
+    conn.executemany("INSERT INTO Highscores(highscore, score_date, score_time, user_id) VALUES (?, ?, ?, ?);",
+                     ((rng.randrange(100000), f"2024-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}",
+                       f"{rng.randrange(24):02}:{rng.randrange(60):02}:{rng.randrange(60):02}", i)
+                      for i in range(1, num_users + 1)))
+    conn.commit()
+
+
+def measure(function, runs=RUNS):
+    # Median milliseconds per call
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def query_leaderboard(userData):
+    # Reads the leaderboard from the database, skipping the cache
+    userData.leaderboard = None
+    return userData.get_leaderboard()
+
+
+def query_plan(userData):
+    rows = userData.conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT Users.username, Highscores.highscore, Highscores.score_date, Highscores.score_time, Highscores.user_id
+        From Highscores
+        JOIN Users ON Users.user_id = Highscores.user_id
+        ORDER BY Highscores.highscore DESC, Highscores.score_date ASC, Highscores.score_time ASC, Highscores.user_id ASC
+        LIMIT 10;
+    """).fetchall()
+    return "; ".join(row[-1] for row in rows)
+
+
+def save_highscore(userData, user_id, score):
+    # Queues a highscore and waits for the writer to commit it, which the game itself never does
+    userData.current_user, userData.current_username = user_id, f"user{user_id}"
+    userData.update_highscore(score)
+    userData.writer.write(("SELECT 1;", ())).result()  # writes are committed in order
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the leaderboard with a large number of accounts")
+    parser.add_argument("--users", type=int, default=USERS, help="accounts in the test database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        # Without the indexes first, the database has the original schema
+        userData = UserData(os.path.join(folder, "leaderboard.db"))
+        userData.conn.execute("DROP INDEX HighscoresRanking;")
+        userData.conn.execute("DROP INDEX HighscoresUser;")
+        start = time.perf_counter()
+        fill_database(userData, args.users)
+        print(f"{args.users} users added in {time.perf_counter() - start:.1f}s")
+
+        results = {}
+        plans = {}
+        plans["no index"] = query_plan(userData)
+        results["query, no index"] = measure(lambda: query_leaderboard(userData), runs=5)
+        results["save highscore, no index"] = measure(lambda: save_highscore(userData, random.randint(1, args.users),
+                                                                             random.randrange(100000)), runs=5)
+
+        userData.close()
+        start = time.perf_counter()
+        userData = UserData(os.path.join(folder, "leaderboard.db"))  # indexes are created again on connecting
+        print(f"Indexes created in {time.perf_counter() - start:.1f}s")
+        plans["indexed"] = query_plan(userData)
+        results["query, indexed"] = measure(lambda: query_leaderboard(userData))
+        results["save highscore, indexed"] = measure(lambda: save_highscore(userData, random.randint(1, args.users),
+                                                                            random.randrange(100000)))
+
+        # What the game does: the leaderboard is read once, then highscores are queued and patched into the cache
+        userData.get_leaderboard()
+        results["get_leaderboard, cached"] = measure(userData.get_leaderboard, runs=1000)
+        userData.current_user, userData.current_username = 1, "user1"
+        results["update_highscore, not top 10"] = measure(lambda: userData.update_highscore(0), runs=1000)
+        scores = iter(range(200000, 300000))
+        results["update_highscore, new top 10"] = measure(lambda: userData.update_highscore(next(scores)), runs=1000)
+        userData.writer.close()  # commits everything queued
+        assert userData.get_leaderboard() == query_leaderboard(userData)  # patched cache matches the database
+        userData.close()
+
+    for name, plan in plans.items():
+        print(f"query plan, {name}: {plan}")
+    for name, milliseconds in results.items():
+        print(f"{name:>30} {milliseconds:>10.4f} ms")
+
+
+if __name__ == "__main__":
+    main()
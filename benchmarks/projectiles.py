@@ -0,0 +1,127 @@
+# Benchmark of the projectile system against the original one sprite per bullet approach
+# Run from the project folder with: python -m benchmarks.projectiles
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import math
+import random
+import time
+import numpy as np
+import pygame
+from settings import *
+
+pygame.init()
+pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+
+from gameobjects import Map, Camera
+from collision import CollisionGrid
+from projectiles import ProjectileSystem
+
+BULLET_COUNTS = [1000, 10000]
+NUM_ENEMIES = 10
+MIN_FRAMES = 3
+MIN_SECONDS = 1
+
+
+class LegacyBullet(pygame.sprite.Sprite):
+    # Original Bullet sprite, kept for comparison
+    IMAGE = pygame.image.load("sprite images/bullet.png")
+
+    def __init__(self, damage, fire_angle, start_pos):
+        super().__init__()
+        self.image = pygame.transform.rotate(LegacyBullet.IMAGE.convert_alpha(), math.degrees(fire_angle))
+        self.direction = pygame.math.Vector2(math.cos(fire_angle), -math.sin(fire_angle)).normalize()
+        self.rect = self.image.get_rect(center=start_pos)
+        self.rect.center += self.direction * 30
+        self.damage = damage
+        self.speed = 20
+
+    def update(self):
+        self.rect.center += self.direction * self.speed
+
+
+def random_shot(floor_positions):
+    x, y = random.choice(floor_positions)
+    return (x * TILE_SIZE + TILE_SIZE / 2, y * TILE_SIZE + TILE_SIZE / 2), random.uniform(-math.pi, math.pi)
+
+
+def run_frames(frame):
+    # Time frames until enough have been run, returns milliseconds per frame
+    frames = 0
+    start = time.perf_counter()
+    while frames < MIN_FRAMES or time.perf_counter() - start < MIN_SECONDS:
+        frame()
+        frames += 1
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def bench_legacy(map, floor_positions, enemies, num_bullets):
+    walls = pygame.sprite.Group()
+    for y, x in np.argwhere(map.array == Map.WALL).tolist():
+        wall = pygame.sprite.Sprite()
+        wall.rect = pygame.Rect(x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+        walls.add(wall)
+    enemy_group = pygame.sprite.Group(enemies)
+    bullets = pygame.sprite.Group()
+
+    def frame():
+        # Keep the number of live bullets constant
+        while len(bullets) < num_bullets:
+            start_pos, angle = random_shot(floor_positions)
+            bullets.add(LegacyBullet(15, angle, start_pos))
+        bullets.update()
+        pygame.sprite.groupcollide(bullets, walls, True, False)
+        pygame.sprite.groupcollide(enemy_group, bullets, False, True)
+
+    return run_frames(frame)
+
+
+def bench_projectiles(map, floor_positions, enemies, num_bullets):
+    projectiles = ProjectileSystem(CollisionGrid(map))
+    enemy_rects = [enemy.rect for enemy in enemies]
+
+    def frame():
+        while len(projectiles) < num_bullets:
+            start_pos, angle = random_shot(floor_positions)
+            projectiles.spawn(ProjectileSystem.PLAYER, start_pos, angle, 15)
+        projectiles.update()
+        projectiles.collide_walls()
+        projectiles.collide_rects(ProjectileSystem.PLAYER, enemy_rects)
+
+    return run_frames(frame)
+
+
+def bench_draw(map, floor_positions, num_bullets):
+    # Drawing cost with every bullet inside the camera view
+    window = pygame.display.get_surface()
+    camera = Camera()
+    projectiles = ProjectileSystem(CollisionGrid(map))
+    for _ in range(num_bullets):
+        angle = random.uniform(-math.pi, math.pi)
+        projectiles.spawn(ProjectileSystem.PLAYER, (random.uniform(0, WINDOW_WIDTH), random.uniform(0, WINDOW_HEIGHT)),
+                          angle, 15)
+    return run_frames(lambda: projectiles.draw(window, camera))
+
+
+def main():
+    random.seed(0)
+    map = Map(BASE_MAP_WIDTH, BASE_MAP_HEIGHT)  # original dungeon size
+    floor_positions = [(x, y) for y, x in np.argwhere(map.array != Map.WALL).tolist()]
+    enemies = []
+    for _ in range(NUM_ENEMIES):
+        enemy = pygame.sprite.Sprite()
+        (x, y), _ = random_shot(floor_positions)
+        enemy.rect = pygame.Rect(0, 0, 60, 60)
+        enemy.rect.center = (x, y)
+        enemies.append(enemy)
+
+    print(f"{'bullets':>8} {'legacy ms':>10} {'arrays ms':>10} {'speedup':>8} {'draw ms':>8}")
+    for num_bullets in BULLET_COUNTS:
+        legacy_ms = bench_legacy(map, floor_positions, enemies, num_bullets)
+        arrays_ms = bench_projectiles(map, floor_positions, enemies, num_bullets)
+        draw_ms = bench_draw(map, floor_positions, num_bullets)
+        print(f"{num_bullets:>8} {legacy_ms:>10.2f} {arrays_ms:>10.2f} {legacy_ms / arrays_ms:>7.1f}x {draw_ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
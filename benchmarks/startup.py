@@ -0,0 +1,98 @@
+# Startup time of the program, every run is a fresh interpreter so nothing is already imported or loaded
+# Run from the project folder with:
+#   python -m benchmarks.startup            deferred startup, as the game runs it
+#   python -m benchmarks.startup --eager    everything loaded before the first page is drawn, for comparison
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 10
+PHASES = ["import", "application", "first_frame", "ready", "game"]
+
+
+def measure_startup(eager):
+    # Milliseconds since the start of the imports at which each phase of startup finished, the game is timed alone
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    times = {}
+    start = time.perf_counter()
+
+    def finished(phase):
+        times[phase] = (time.perf_counter() - start) * 1000
+
+    import pygame
+    from main import Application
+    from assets import assets
+    finished("import")
+    app = Application()
+    finished("application")
+
+    if eager:
+        # What startup used to do, every page, image and module was loaded before the window showed anything
+        for name in app.page_types:
+            app.get_page(name)
+        importlib.import_module("game")  # the game module and everything it imports
+        for path in app.preload_paths():
+            assets.load(path)
+    app.get_page(app.current_page).draw(app.window)
+    pygame.display.update()
+    finished("first_frame")
+
+    # Everything needed by the menu and the game, lazy startup loads it while the user is signing in
+    if not eager:
+        app.start_preload()
+        app.game_module.result()
+        app.preloader.shutdown(wait=True)
+    for name in app.page_types:
+        app.get_page(name)
+    finished("ready")
+
+    game_start = time.perf_counter()
+    app.create_game()
+    times["game"] = (time.perf_counter() - game_start) * 1000
+    return times
+
+
+def run_startup(eager, runs=RUNS):
+    # Median of each phase over fresh processes, the process time also includes starting the interpreter
+    command = [sys.executable, "-m", "benchmarks.startup", "--child"] + (["--eager"] if eager else [])
+    results = []
+    process_times = []
+    for _ in range(runs):
+        process_start = time.perf_counter()
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        process_times.append((time.perf_counter() - process_start) * 1000)
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    medians = {phase: statistics.median(result[phase] for result in results) for phase in PHASES}
+    medians["process"] = statistics.median(process_times)
+    return medians
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how long the program takes to start")
+    parser.add_argument("--eager", action="store_true", help="load everything before drawing the first page")
+    parser.add_argument("--runs", type=int, default=RUNS, help="processes started, the median is reported")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_startup(args.eager)))
+        return
+
+    medians = run_startup(args.eager, args.runs)
+    print(f"{'eager' if args.eager else 'deferred'} startup, median of {args.runs} runs")
+    print(f"{'imports done':>24} {medians['import']:>8.1f} ms")
+    print(f"{'application created':>24} {medians['application']:>8.1f} ms")
+    print(f"{'sign in page drawn':>24} {medians['first_frame']:>8.1f} ms")
+    print(f"{'ready to play':>24} {medians['ready']:>8.1f} ms")
+    print(f"{'game created':>24} {medians['game']:>8.1f} ms after clicking play")
+    print(f"{'whole process':>24} {medians['process']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
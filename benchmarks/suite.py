@@ -0,0 +1,242 @@
+# Benchmarks of the game's hot paths, run under the dummy video driver so no window is needed
+# Run from the project folder with:
+#   python -m benchmarks.suite --output results.json                 save results
+#   python -m benchmarks.suite --baseline results.json               run again and flag regressions
+#   python -m benchmarks.suite --against new.json --baseline old.json  compare two saved results
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+import pygame
+from settings import *
+
+pygame.init()
+pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+
+from game import Game
+from gameobjects import Map, Enemy
+from inputs import RandomInput
+from projectiles import ProjectileSystem
+from dungeonpack import DungeonPack, write_pack
+
+# Each sweep changes one setting and keeps the others at their default
+DEFAULT_ENEMIES = 10
+DEFAULT_BULLETS = 100
+DEFAULT_MAP_SCALE = 1
+ENEMY_COUNTS = [1, 10, 50, 100, 250, 500]
+BULLET_COUNTS = [0, 100, 1000, 5000]
+MAP_SCALES = [1, 5, 10]  # dungeon width and height in multiples of the original size
+
+# Every benchmark runs at least MIN_RUNS times and for at least MIN_SECONDS
+MIN_RUNS = 5
+MIN_SECONDS = 0.5
+QUICK_MIN_RUNS = 3
+QUICK_MIN_SECONDS = 0.1
+
+REGRESSION_THRESHOLD = 0.25  # slower than the baseline by more than this fraction counts as a regression
+NOISE_FLOOR_MS = 0.01  # changes in benchmarks faster than this are timer noise, not regressions
+
+
+def measure(function, setup=None, min_runs=MIN_RUNS, min_seconds=MIN_SECONDS):
+    # Times calls to function, setup runs before every call but is not timed, returns milliseconds per call
+    times = []
+    start = time.perf_counter()
+    while len(times) < min_runs or time.perf_counter() - start < min_seconds:
+        if setup is not None:
+            setup()
+        call_start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - call_start) * 1000)
+    return {
+        "runs": len(times),
+        "mean_ms": statistics.fmean(times),
+        "median_ms": statistics.median(times),
+        "min_ms": min(times),
+    }
+
+
+def make_game(num_enemies, num_bullets, map_scale, seed=0):
+    # Game in the middle of a fight, the player can't die so the scene stays the same while it is measured
+    game = Game(input_source=RandomInput(seed), render=True, fps=0, seed=seed, map_scale=map_scale)
+    game.generate_dungeon()
+    game.player.take_damage = lambda damage: None
+    for enemy in game.enemy_sprites:
+        enemy.kill()
+
+    # Enemies are spread over the rooms, the first ones share the player's room so some are always on screen
+    rooms = game.map.rooms
+    for i in range(num_enemies):
+        room = rooms[i % len(rooms)]
+        enemy = Enemy(random.randint(room.left, room.right - 60), random.randint(room.top, room.bottom - 60), game)
+        game.enemy_sprites.add(enemy)
+        game.dynamic_sprites.add(enemy)
+    game.camera_scroll()
+    refill_bullets(game, num_bullets)
+    return game
+
+
+def refill_bullets(game, num_bullets):
+    # Keep the number of live bullets constant, new bullets are fired from floor tiles around the player
+    x, y = game.player.rect.center
+    while len(game.projectiles) < num_bullets:
+        start_pos = (x + random.uniform(-WINDOW_WIDTH / 2, WINDOW_WIDTH / 2),
+                     y + random.uniform(-WINDOW_HEIGHT / 2, WINDOW_HEIGHT / 2))
+        if game.collision_grid.point_collides(start_pos):
+            start_pos = (x, y)
+        owner = random.choice([ProjectileSystem.PLAYER, ProjectileSystem.ENEMY])
+        game.projectiles.spawn(owner, start_pos, random.uniform(-math.pi, math.pi), 1)
+
+
+def bench_map(map_scale, timing):
+    width, height = BASE_MAP_WIDTH * map_scale, BASE_MAP_HEIGHT * map_scale
+    map = Map(width, height)
+    results = {
+        "map_generate": measure(lambda: Map(width, height), **timing),
+        "map_create_graph": measure(map.create_graph, **timing),
+    }
+    # Same map loaded from a dungeon pack instead
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "bench.dpak")
+        write_pack(path, [(0, map)], 1)
+        pack = DungeonPack(path)
+        results["map_load_pack"] = measure(lambda: pack.load(0), **timing)
+        del pack  # file is memory mapped, it has to be closed before the folder is removed
+    return results
+
+
+def bench_game(num_enemies, num_bullets, map_scale, timing):
+    game = make_game(num_enemies, num_bullets, map_scale)
+    floor = np.argwhere(game.map.array != Map.WALL)
+    enemies = list(game.enemy_sprites)
+
+    def move_player():
+        # Player jumps to a random floor tile, so cached paths have to be repaired or searched again
+        y, x = floor[random.randrange(len(floor))]
+        game.player.rect.center = game.map.node(int(y) * game.map.width + int(x))
+
+    def calculate_paths():
+        for enemy in enemies:
+            enemy.calculate_path()
+
+    results = {"enemy_calculate_path": measure(calculate_paths, move_player, **timing)}
+
+    # The scene is rebuilt so moving the player around doesn't change the remaining benchmarks
+    game = make_game(num_enemies, num_bullets, map_scale)
+    refill = lambda: refill_bullets(game, num_bullets)
+    results["camera_scroll"] = measure(game.camera_scroll, **timing)
+    results["handle_collisions"] = measure(game.handle_collisions, refill, **timing)
+    results["draw"] = measure(game.draw, refill, **timing)
+    results["frame"] = measure(game.run_frame, refill, **timing)
+    return results
+
+
+def scenarios():
+    # (enemies, bullets, map scale) of every game benchmark, the default scene is only run once
+    seen = set()
+    for scene in ([(count, DEFAULT_BULLETS, DEFAULT_MAP_SCALE) for count in ENEMY_COUNTS] +
+                  [(DEFAULT_ENEMIES, count, DEFAULT_MAP_SCALE) for count in BULLET_COUNTS] +
+                  [(DEFAULT_ENEMIES, DEFAULT_BULLETS, scale) for scale in MAP_SCALES]):
+        if scene not in seen:
+            seen.add(scene)
+            yield scene
+
+
+def run_suite(quick=False):
+    timing = {"min_runs": QUICK_MIN_RUNS, "min_seconds": QUICK_MIN_SECONDS} if quick else {}
+    results = []
+
+    for map_scale in MAP_SCALES:
+        random.seed(map_scale)
+        for name, stats in bench_map(map_scale, timing).items():
+            results.append({"name": name, "enemies": 0, "bullets": 0, "map_scale": map_scale, **stats})
+            print_result(results[-1])
+
+    for num_enemies, num_bullets, map_scale in scenarios():
+        random.seed(0)
+        for name, stats in bench_game(num_enemies, num_bullets, map_scale, timing).items():
+            results.append({"name": name, "enemies": num_enemies, "bullets": num_bullets, "map_scale": map_scale,
+                            **stats})
+            print_result(results[-1])
+
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+        },
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def result_key(result):
+    return result["name"], result["enemies"], result["bullets"], result["map_scale"]
+
+
+def print_result(result):
+    print(f"{result['name']:>22} {result['enemies']:>7} {result['bullets']:>7} {result['map_scale']:>5} "
+          f"{result['median_ms']:>10.3f} ms")
+
+
+def compare(current, baseline, threshold=REGRESSION_THRESHOLD):
+    # Returns the results whose median is slower than the baseline by more than the threshold
+    baseline_results = {result_key(result): result for result in baseline["results"]}
+    regressions = []
+    print(f"{'benchmark':>22} {'enemies':>7} {'bullets':>7} {'scale':>5} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for result in current["results"]:
+        base = baseline_results.get(result_key(result))
+        if base is None:
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1
+        flag = ""
+        if change > threshold and result["median_ms"] > NOISE_FLOOR_MS:
+            regressions.append(result)
+            flag = "  REGRESSION"
+        print(f"{result['name']:>22} {result['enemies']:>7} {result['bullets']:>7} {result['map_scale']:>5} "
+              f"{base['median_ms']:>10.3f} {result['median_ms']:>10.3f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare against, exits with 1 if anything regressed")
+    parser.add_argument("--against", help="compare these saved results with the baseline instead of running")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="fraction slower than the baseline that counts as a regression")
+    parser.add_argument("--quick", action="store_true", help="fewer runs per benchmark, for a rough check")
+    args = parser.parse_args()
+
+    if args.against:
+        with open(args.against) as file:
+            current = json.load(file)
+    else:
+        print(f"{'benchmark':>22} {'enemies':>7} {'bullets':>7} {'scale':>5} {'median':>13}")
+        current = run_suite(args.quick)
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump(current, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(current, baseline, args.threshold)
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
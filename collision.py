@@ -0,0 +1,28 @@
+from settings import *
+
+
+# Walls sit on a fixed grid, so only the few tiles under a rect or point need to be checked
+class CollisionGrid:
+    def __init__(self, map):
+        self.width = map.width
+        self.height = map.height
+        self.walls = map.array == map.WALL  # True for every wall tile
+
+    def tile_range(self, rect):
+        # Columns and rows overlapped by the rect, right and bottom edges are not part of a rect
+        x_start, x_end = rect.left // TILE_SIZE, (rect.right - 1) // TILE_SIZE
+        y_start, y_end = rect.top // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE
+        return x_start, x_end, y_start, y_end
+
+    def rect_collides(self, rect):
+        x_start, x_end, y_start, y_end = self.tile_range(rect)
+        # Anything outside of the map counts as a wall
+        if x_start < 0 or y_start < 0 or x_end >= self.width or y_end >= self.height:
+            return True
+        return self.walls[y_start:y_end + 1, x_start:x_end + 1].any()
+
+    def point_collides(self, pos):
+        x, y = int(pos[0] // TILE_SIZE), int(pos[1] // TILE_SIZE)
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return True
+        return self.walls[y, x]
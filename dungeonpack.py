@@ -0,0 +1,200 @@
+# Generated dungeons saved in a single binary file that is memory mapped, maps are used straight from the file
+# Usage:
+#   python dungeonpack.py build dungeons.dpak --count 1000 --seed 0 [--scale 1] [--distances] [--workers 4]
+#   python dungeonpack.py info dungeons.dpak
+#
+# File layout, every number is little endian and every section starts on an 8 byte boundary:
+#   header    HEADER_DTYPE
+#   entries   ENTRY_DTYPE for each dungeon
+#   data      sections of each dungeon at its entry's offset, in the order of SECTIONS
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # building a pack doesn't need a window
+
+import argparse
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from settings import *
+from gameobjects import Map
+from dungeons import generate_map
+
+MAGIC = b"DPAK"
+VERSION = 1
+HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u4"), ("count", "<u4"), ("reserved", "<u4")])
+ENTRY_DTYPE = np.dtype([
+    ("seed", "<u4"),  # seed the dungeon was generated from
+    ("map_seed", "<u4"),  # seed of the chest contents (Map.seed)
+    ("width", "<u4"),
+    ("height", "<u4"),
+    ("num_rooms", "<u4"),
+    ("num_chests", "<u4"),
+    ("num_edges", "<u4"),
+    ("has_distances", "<u4"),
+    ("offset", "<u8"),  # start of the dungeon's data from the start of the file
+])
+# Name, type and number of values of each section in a dungeon's data, distances are left out if not saved
+SECTIONS = [
+    ("array", "u1", lambda entry: entry["height"] * entry["width"]),  # map array
+    ("rooms", "<i4", lambda entry: entry["num_rooms"] * 4),  # x, y, width and height of every room in pixels
+    ("chests", "<i4", lambda entry: entry["num_chests"] * 2),  # x and y tile of every chest
+    ("graph_indptr", "<i4", lambda entry: entry["height"] * entry["width"] + 1),
+    ("graph_indices", "<i4", lambda entry: entry["num_edges"]),
+    ("distances", "<i4", lambda entry: entry["height"] * entry["width"] * entry["has_distances"]),  # tiles to spawn
+]
+
+
+def align(size):
+    return (size + 7) // 8 * 8
+
+
+def section_layout(entry):
+    # Offset from the start of the dungeon's data, type and length of each section
+    layout = {}
+    offset = 0
+    for name, dtype, length in SECTIONS:
+        length = int(length(entry))
+        layout[name] = (offset, np.dtype(dtype), length)
+        offset += align(length * np.dtype(dtype).itemsize)
+    return layout, offset
+
+
+def spawn_distances(map):
+    # Tiles between every tile and the player's spawn point, -1 if it can't be reached
+    indptr, indices = map.graph_lists
+    distances = [-1] * (map.width * map.height)
+    start = map.tile_id(map.rooms[0].center)
+    distances[start] = 0
+    queue = deque([start])
+    while queue:
+        tile_id = queue.popleft()
+        distance = distances[tile_id] + 1
+        for neighbor in indices[indptr[tile_id]:indptr[tile_id + 1]]:
+            if distances[neighbor] == -1:
+                distances[neighbor] = distance
+                queue.append(neighbor)
+    return np.array(distances, dtype=np.int32)
+
+
+def write_pack(path, dungeons, count, distances=False):
+    # dungeons gives (seed, map) pairs, count of them, each dungeon is written as soon as it arrives
+    header = np.zeros(1, HEADER_DTYPE)
+    header[0] = (MAGIC, VERSION, count, 0)
+    entries = np.zeros(count, ENTRY_DTYPE)
+    offset = align(HEADER_DTYPE.itemsize + ENTRY_DTYPE.itemsize * count)
+
+    with open(path, "wb") as file:
+        file.seek(offset)
+        for i, (seed, map) in enumerate(dungeons):
+            chests = np.argwhere(map.array == Map.CHEST)[:, ::-1]  # rows of y, x turned into x, y
+            sections = {
+                "array": map.array,
+                "rooms": np.array([tuple(room) for room in map.rooms]),
+                "chests": chests,
+                "graph_indptr": map.graph_indptr,
+                "graph_indices": map.graph_indices,
+                "distances": spawn_distances(map) if distances else np.zeros(0),
+            }
+            entries[i] = (seed, map.seed, map.width, map.height, len(map.rooms), len(chests),
+                          len(map.graph_indices), distances, offset)
+            layout, size = section_layout(entries[i])
+            for name, (section_offset, dtype, length) in layout.items():
+                file.seek(offset + section_offset)
+                file.write(np.ascontiguousarray(sections[name], dtype=dtype).tobytes())
+            offset += size
+        file.truncate(offset)
+        file.seek(0)
+        file.write(header.tobytes())
+        file.write(entries.tobytes())
+
+
+class DungeonPack:
+    def __init__(self, path):
+        # Copy on write, so a map can change its own array (opened chests) without touching the file
+        self.data = np.memmap(path, dtype=np.uint8, mode="c")
+        header = self.data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} dungeon pack")
+        entries_end = HEADER_DTYPE.itemsize + ENTRY_DTYPE.itemsize * int(header["count"])
+        self.entries = self.data[HEADER_DTYPE.itemsize:entries_end].view(ENTRY_DTYPE)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def arrays(self, index):
+        # Every section of a dungeon as an array viewing the file, nothing is copied or parsed
+        entry = self.entries[index]
+        start = int(entry["offset"])
+        layout, _ = section_layout(entry)
+        arrays = {}
+        for name, (offset, dtype, length) in layout.items():
+            offset += start
+            arrays[name] = self.data[offset:offset + length * dtype.itemsize].view(dtype)
+        arrays["array"] = arrays["array"].reshape(int(entry["height"]), int(entry["width"]))
+        arrays["rooms"] = arrays["rooms"].reshape(-1, 4)
+        arrays["chests"] = arrays["chests"].reshape(-1, 2)
+        if not entry["has_distances"]:
+            arrays["distances"] = None
+        return arrays
+
+    def load(self, index):
+        # Map of a saved dungeon, the same as the map generated from the entry's seed
+        arrays = self.arrays(index)
+        return Map.from_arrays(arrays["array"], arrays["rooms"], int(self.entries[index]["map_seed"]),
+                               arrays["graph_indptr"], arrays["graph_indices"])
+
+
+def build(args):
+    width, height = BASE_MAP_WIDTH * args.scale, BASE_MAP_HEIGHT * args.scale
+    seeds = range(args.seed, args.seed + args.count)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as executor:
+        maps = executor.map(generate_map, [width] * args.count, [height] * args.count, seeds, chunksize=16)
+        write_pack(args.path, zip(seeds, maps), args.count, args.distances)
+    seconds = time.perf_counter() - start
+    print(f"Wrote {args.count} dungeons of {width}x{height} tiles to {args.path} in {seconds:.2f}s "
+          f"({os.path.getsize(args.path) / 1e6:.1f} MB)")
+
+
+def info(args):
+    start = time.perf_counter()
+    pack = DungeonPack(args.path)
+    open_time = time.perf_counter() - start
+    entries = pack.entries
+    print(f"{len(pack)} dungeons, seeds {entries['seed'].min()} to {entries['seed'].max()}, "
+          f"{os.path.getsize(args.path) / 1e6:.1f} MB, opened in {open_time * 1000:.3f} ms")
+    print(f"sizes {sorted(set(zip(entries['width'].tolist(), entries['height'].tolist())))}, "
+          f"{entries['num_rooms'].mean():.1f} rooms and {entries['num_chests'].mean():.1f} chests on average, "
+          f"distances {'saved' if entries['has_distances'].all() else 'not saved'}")
+
+    # Time to load every dungeon as a Map
+    times = []
+    for index in range(len(pack)):
+        start = time.perf_counter()
+        pack.load(index)
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"Map load median {np.median(times):.4f} ms, max {max(times):.4f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and inspect packs of generated dungeons")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", help="generate seeded dungeons into a pack")
+    build_parser.add_argument("path")
+    build_parser.add_argument("--count", type=int, default=1000, help="dungeons to generate")
+    build_parser.add_argument("--seed", type=int, default=0, help="seed of the first dungeon, the rest count up")
+    build_parser.add_argument("--scale", type=int, default=1, help="dungeon size in multiples of the original size")
+    build_parser.add_argument("--distances", action="store_true", help="save every tile's distance to the spawn")
+    build_parser.add_argument("--workers", type=int, default=None, help="processes generating dungeons")
+    info_parser = commands.add_parser("info", help="describe a pack and time loading its dungeons")
+    info_parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args)
+    else:
+        info(args)
+
+
+if __name__ == "__main__":
+    main()
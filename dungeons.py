@@ -0,0 +1,31 @@
+import random
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from gameobjects import Map
+
+
+def generate_map(width, height, seed):
+    # Runs in the worker process, the finished map (array, rooms and graph) is pickled back to the game
+    random.seed(seed)
+    return Map(width, height)
+
+
+# Generates the next dungeon in a separate process while the current one is being played
+class DungeonGenerator:
+    def __init__(self):
+        self.executor = None  # worker process is started when the first dungeon is requested
+
+    def start(self):
+        # Starting the worker takes a while, so it is started with the game rather than when the first map is needed
+        if self.executor is None:
+            # Spawned instead of forked, the game process has a display and background threads
+            self.executor = ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"))
+            self.executor.submit(int)  # process is only launched once it is given something to do
+
+    def submit(self, width, height, seed):
+        # Returns a future of the map, the same seed always gives the same map
+        self.start()
+        return self.executor.submit(generate_map, width, height, seed)
+
+
+dungeon_generator = DungeonGenerator()  # one worker process for the whole program
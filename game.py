@@ -0,0 +1,301 @@
+import pygame
+import sys
+import math
+import random
+from settings import *
+from GUIs import GameHUD, ScreenTransitions
+from gameobjects import *
+from pathfinding import FlowField, AStar
+from collision import CollisionGrid
+from projectiles import ProjectileSystem
+from rotation import rotation_cache
+from inputs import PygameInput
+from timing import SimulationClock, Scheduler
+from profiler import FrameProfiler
+from lod import AILevelOfDetail
+from perception import Perception
+from dungeons import dungeon_generator
+
+
+class Game:
+    def __init__(self, input_source=None, render=True, fps=FPS, seed=None, time_scale=1, map_scale=DUNGEON_SCALE,
+                 map=None):
+        # General setup
+        self.window = pygame.display.get_surface()
+        self.clock = pygame.time.Clock()
+        self.sim_clock = SimulationClock(time_scale)  # game time, separate from the frame rate
+        self.scheduler = Scheduler(self.sim_clock)  # delayed actions, thrown away with the dungeon
+
+        # Headless runs use scripted input, skip drawing and don't limit the frame rate (fps of 0)
+        self.input = input_source or PygameInput()
+        self.render = render
+        self.fps = fps
+        if seed is not None:
+            random.seed(seed)  # same map, enemies and chests every time
+        self.frame_count = 0  # simulation steps run
+        self.map_scale = map_scale  # map width and height are multiplied by this
+        self.profiler = FrameProfiler()  # per phase frame timing, off until PROFILER_KEY is pressed
+
+        # Hide the mouse and initialise the crosshair
+        pygame.mouse.set_visible(False)
+        self.crosshair = Crosshair()
+
+        # Game sprite groups
+        self.dynamic_sprites = pygame.sprite.Group()  # contains sprites that are moving and updating
+        self.chest_sprites = pygame.sprite.Group()  # contains map chest
+
+        # Enemy management
+        self.enemy_sprites = pygame.sprite.Group()
+
+        # Map, new dungeons are given a map generated in the background
+        self.map = map if map is not None else Map(BASE_MAP_WIDTH * map_scale, BASE_MAP_HEIGHT * map_scale)
+        self.next_map = None  # future of the map for the next new dungeon
+        dungeon_generator.start()
+        self.static_layer = StaticLayer(self.map)  # pre-drawn floors and walls
+        self.chest_layer = ChestLayer(self.map, self.chest_sprites)  # chests near the player
+        self.collision_grid = CollisionGrid(self.map)  # wall collisions
+        self.projectiles = ProjectileSystem(self.collision_grid)  # every bullet fired by the player and enemies
+        self.perception = Perception(self.collision_grid)  # enemy distances, angles and line of sight to the player
+
+        # Game variables
+        self.level = 1
+        self.player_score = 0
+
+        # Time variables
+        self.elapsed_time = 0
+        self.last_min = 0
+
+        # Camera follows the player, the world itself never moves
+        self.camera = Camera()
+
+        # Create player and add to group
+        self.player = Player(self)
+        self.dynamic_sprites.add(self.player)
+
+        # Enemies share a single distance field towards the player
+        self.flow_field = FlowField(self.map, self.player)
+        self.astar = AStar(self.map)
+        self.ai_lod = AILevelOfDetail(self.map)  # distant enemies are updated less often
+
+        self.HUD = GameHUD(self)  # Initialise heads up display
+        self.screenTransitions = ScreenTransitions()
+
+    def run(self, max_frames=None):
+        self.generate_dungeon()
+        while self.player.alive and (max_frames is None or self.frame_count < max_frames):
+            self.run_frame()
+
+        # Return score after game finishes running
+        if self.render:
+            self.screenTransitions.game_over(self.window, self.player_score)
+        return self.player_score
+
+    def run_frame(self):
+        # Every phase goes through the profiler, which just calls it while profiling is off
+        profiler = self.profiler
+        if profiler.enabled:
+            profiler.begin_frame()
+        profiler.measure("events", self.check_events)
+        # Run as many fixed simulation steps as needed to catch up with the time that has passed
+        for _ in range(profiler.measure("wait", self.simulation_steps)):
+            profiler.measure("collisions", self.handle_collisions)
+            profiler.measure("update", self.update)
+            if not self.player.alive:
+                break
+        profiler.measure("camera", self.camera_scroll)
+        if self.render:
+            profiler.measure("draw", self.draw)
+            profiler.measure("display", pygame.display.update)
+        if profiler.enabled:
+            profiler.end_frame(self.frame_counts())
+
+    def frame_counts(self):
+        # Workload of the last frame, path expansions are counted since the previous frame
+        expansions = self.astar.expansions + self.flow_field.expansions
+        self.astar.expansions = self.flow_field.expansions = 0
+        return {
+            "enemies": len(self.enemy_sprites),
+            "entities": len(self.dynamic_sprites) + len(self.chest_sprites),
+            "bullets": len(self.projectiles),
+            "path_expansions": expansions,
+            "ai_near": self.ai_lod.counts[AILevelOfDetail.NEAR],
+            "ai_mid": self.ai_lod.counts[AILevelOfDetail.MID],
+            "ai_far": self.ai_lod.counts[AILevelOfDetail.FAR],
+        }
+
+    def generate_dungeon(self):
+        # Translate game map into corresponding objects
+        self.player.rect.center = self.map.rooms[0].center  # player spawns in the middle of the first room
+        rotation_cache.prewarm(self.projectiles.image)  # bullets are small and fired at every angle
+        # Floors and walls are drawn by the static layer, so only chests need sprites
+        self.chest_layer.update(self.player.rect.center)
+        self.spawn_enemies()
+
+    def check_events(self):
+        for event in self.input.get_events():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+
+            # Frame profiler keys
+            elif event.type == pygame.KEYDOWN and event.key == PROFILER_KEY:
+                self.profiler.toggle()
+            elif event.type == pygame.KEYDOWN and event.key == PROFILE_DUMP_KEY:
+                self.profiler.dump()
+
+            # Player only needs to deal with mouse and keyboard presses
+            elif event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.KEYDOWN:
+                self.player.handle_event(event)
+
+    def simulation_steps(self):
+        real_time = self.clock.tick(self.fps) / 1000  # restrict frame rate
+        # Uncapped runs take exactly one step per frame so they simulate as fast as possible
+        if self.fps == 0:
+            return 1
+        return self.sim_clock.advance(real_time)
+
+    def get_alpha(self):
+        # Uncapped runs are always drawn right after a step
+        return 1 if self.fps == 0 else self.sim_clock.get_alpha()
+
+    def camera_scroll(self):
+        # Keep the player at the screen center, sprites are offset by the camera when drawn
+        self.camera.follow(self.player, self.get_alpha())
+
+    def handle_collisions(self):
+        # Bullet-wall collision deletes bullet
+        self.projectiles.collide_walls()
+
+        # Player-chest collisions
+        chests_collided = pygame.sprite.spritecollide(self.player, self.chest_sprites, False)
+        for chest in chests_collided:
+            self.chest_layer.open(chest)
+            self.player.handle_item(chest.item)
+
+        # Player collision with enemy bullet
+        for _, damage in self.projectiles.collide_rects(ProjectileSystem.ENEMY, [self.player.rect]):
+            self.player.take_damage(damage)
+
+        # Enemy collision with player bullet
+        enemies = self.enemy_sprites.sprites()
+        enemy_rects = [enemy.rect for enemy in enemies]
+        for enemy_index, damage in self.projectiles.collide_rects(ProjectileSystem.PLAYER, enemy_rects):
+            enemies[enemy_index].take_damage(damage)
+
+    def draw(self):
+        # Fill the window and draw the map floor
+        self.window.fill("burlywood")
+        self.static_layer.draw(self.window, self.camera)
+
+        # Draw game sprites, moving sprites are drawn between their last two simulation steps
+        alpha = self.get_alpha()
+        self.camera.draw(self.window, self.chest_sprites)
+        self.camera.draw(self.window, self.dynamic_sprites, alpha)
+        self.projectiles.draw(self.window, self.camera, alpha)
+
+        # Draw enemy health bars
+        for enemy in self.enemy_sprites:
+            rect = self.camera.interpolate(enemy, alpha)
+            dx, dy = rect.x - enemy.rect.x, rect.y - enemy.rect.y  # bars move with the interpolated enemy
+            if self.camera.is_visible(enemy.max_healthbar.move(dx, dy)):
+                pygame.draw.rect(self.window, "red", self.camera.apply(enemy.max_healthbar.move(dx, dy)))
+                pygame.draw.rect(self.window, "green", self.camera.apply(enemy.healthbar.move(dx, dy)))
+
+        # Draw heads up display and crosshair
+        self.HUD.draw(self.window)
+        self.crosshair.draw(self.window)
+
+    def update(self):
+        # One fixed simulation step
+        for sprite in self.dynamic_sprites:
+            sprite.previous_center = sprite.rect.center  # kept for drawing between steps
+
+        # Player score update
+        self.update_score()
+
+        # Spawn new enemies after all are killed
+        if len(self.enemy_sprites) == 0:
+            self.level += 1
+            # New dungeon generated every 5 levels
+            if self.level % 5 == 0:
+                self.new_dungeon()
+            else:
+                self.spawn_enemies()
+                if (self.level + 1) % 5 == 0:
+                    self.generate_next_map()  # ready by the time this level is cleared
+
+        # Display update
+        self.crosshair.update(self.input.get_mouse_pos())
+        self.flow_field.update()  # rebuilt only if the player has moved to a new tile
+        self.chest_layer.update(self.player.rect.center)  # chests are created and removed as the player moves
+        self.perception.update(self.enemy_sprites, self.player)
+        self.ai_lod.update(self.enemy_sprites, self.player, self.perception)
+        self.projectiles.update()
+        self.dynamic_sprites.update()
+        self.sim_clock.tick()
+        self.scheduler.update()  # run actions that became due during this step
+        self.frame_count += 1
+
+    def update_score(self):
+        # Update score for every minute passed
+        self.elapsed_time += self.sim_clock.step * 1000  # update elapsed time in game time
+        current_min = self.elapsed_time // 60000  # convert from milliseconds to the current minute
+        if current_min > self.last_min:
+            self.player_score += MINUTE_POINTS  # increment score
+            self.last_min = current_min  # update to the next minute
+
+        # Update score for enemy eliminations
+        for enemy in self.enemy_sprites:
+            if not enemy.is_alive():
+                self.player_score += ELIM_POINTS
+
+    def spawn_enemies(self):
+        # Default enemy spawned in the first level
+        if self.level == 1:
+            num_enemies = 1
+            enemyClass = Enemy
+        else:
+            num_enemies = random.randint(3, 5)  # 3 to 5 enemies spawned per wave
+            enemyClass = random.choice([Enemy, ShotgunEnemy, SniperEnemy])  # enemy type chosen randomly
+
+        occupied_rooms = []
+        # Add the player's current room to the list of occupied rooms
+        for room in self.map.rooms:
+            if room.collidepoint(self.player.rect.center):
+                occupied_rooms.append(room)
+                break
+
+        # Spawn enemies in different rooms, only rooms near the player are used so big dungeons don't spread them out
+        nearby_rooms = sorted(self.map.rooms, key=lambda room: math.dist(room.center, self.player.rect.center))
+        nearby_rooms = nearby_rooms[:SPAWN_ROOM_CHOICES]
+        for _ in range(num_enemies):
+            room = random.choice(nearby_rooms)
+            # Make sure room is not occupied
+            while room in occupied_rooms:
+                room = random.choice(nearby_rooms)
+            occupied_rooms.append(room)
+            spawn_x, spawn_y = room.center
+            # create instance of enemy
+            enemy = enemyClass(spawn_x, spawn_y, self)
+            enemy.set_difficulty(self.level)
+            self.enemy_sprites.add(enemy)
+            self.dynamic_sprites.add(enemy)
+
+    def generate_next_map(self):
+        # Map for the next dungeon is generated by a worker process while this one is played
+        seed = random.getrandbits(32)  # drawn here so seeded games get the same dungeons
+        width, height = BASE_MAP_WIDTH * self.map_scale, BASE_MAP_HEIGHT * self.map_scale
+        self.next_map = dungeon_generator.submit(width, height, seed)
+
+    def new_dungeon(self):
+        if self.next_map is None:
+            self.generate_next_map()  # level was reached without going through the previous one
+        if self.render:
+            # Transition keeps handling events and runs until the map has arrived
+            self.screenTransitions.new_dungeon(self.window, self.next_map.done)
+        map = self.next_map.result()
+        level, score, frame_count, profiler = self.level, self.player_score, self.frame_count, self.profiler
+        self.__init__(self.input, self.render, self.fps, time_scale=self.sim_clock.time_scale, map_scale=self.map_scale,
+                      map=map)
+        self.level, self.player_score, self.frame_count, self.profiler = level, score, frame_count, profiler
+        self.generate_dungeon()
@@ -1,20 +1,34 @@
 import pygame
 import math
-import time
-import threading
 import random
-import heapq
+import numpy as np
+from collections import OrderedDict
 from settings import *
+from pathfinding import PathCache
+from projectiles import ProjectileSystem
+from rotation import rotation_cache
+from lod import AILevelOfDetail
+from assets import assets
 
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, obstacle_sprites):
+    IMAGE_PATH = "sprite images/player sprite.png"
+    BULLET_OWNER = ProjectileSystem.PLAYER
+
+    def __init__(self, game):
         super().__init__()
-        self.obstacle_sprites = obstacle_sprites
+        self.input = game.input  # keyboard and mouse state
+        self.collision_grid = game.collision_grid  # map walls
+        self.camera = game.camera  # needed to convert the mouse position into world coordinates
+        self.projectiles = game.projectiles  # fired bullets are added here
+        self.clock = game.sim_clock  # game time for weapons
+        self.scheduler = game.scheduler  # delayed actions such as finishing a reload
         # Sprite setup
-        self.image = self.original_image = pygame.image.load("sprite images/player sprite.png").convert_alpha()
+        self.base_image = assets.image(self.IMAGE_PATH)  # unrotated image
+        self.image = self.base_image
         self.rect = self.image.get_rect()
         self.rect.center = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)  # spawn position
+        self.previous_center = self.rect.center  # position before the last simulation step, for drawing
 
         self.alive = True
         self.health = MAX_PLAYER_HEALTH
@@ -24,8 +38,6 @@ class Player(pygame.sprite.Sprite):
         self.inventory = [Pistol(self)]
         self.equippedWeapon = self.inventory[0]  # primary weapon
 
-        self.bullets_fired = pygame.sprite.Group()  # all bullets fired by player
-
     def draw(self, window):
         window.blit(self.image, (self.rect.x, self.rect.y))
 
@@ -35,11 +47,9 @@ class Player(pygame.sprite.Sprite):
             return
         self.move()
         self.rotate()
-        for weapon in self.inventory:
-            self.bullets_fired.add(weapon.bullets_fired)  # add any new bullets fired
 
     def move(self):
-        keys = pygame.key.get_pressed()  # returns boolean values for each key pressed
+        keys = self.input.get_pressed()  # returns boolean values for each key pressed
         dx, dy = 0, 0
 
         # Position changes based on pressing "WASD" keys
@@ -66,29 +76,25 @@ class Player(pygame.sprite.Sprite):
         self.rect.centery += dy
 
     def check_collision(self, dx, dy):
-        for obstacle in self.obstacle_sprites:
-            # Check for x and y collisions and set position change to 0 if obstacle is in the way
-            if obstacle.rect.colliderect(self.rect.x + dx, self.rect.y, self.rect.width, self.rect.height):
-                dx = 0
-            if obstacle.rect.colliderect(self.rect.x, self.rect.y + dy, self.rect.width, self.rect.height):
-                dy = 0
+        # Check for x and y collisions and set position change to 0 if a wall is in the way
+        x_moved = pygame.Rect(self.rect.x + dx, self.rect.y, self.rect.width, self.rect.height)
+        y_moved = pygame.Rect(self.rect.x, self.rect.y + dy, self.rect.width, self.rect.height)
+        if self.collision_grid.rect_collides(x_moved):
+            dx = 0
+        if self.collision_grid.rect_collides(y_moved):
+            dy = 0
         return dx, dy
 
     def rotate(self):
         angle = self.calc_angle()
-        self.image = pygame.transform.rotate(self.original_image, math.degrees(angle))  # rotate image to face mouse
-        new_rect = self.image.get_rect(center=self.rect.center)
-        intersect = False
-        for obstacle in self.obstacle_sprites:
-            # Check if turning around will cause the player to be stuck
-            if obstacle.rect.colliderect(new_rect):
-                intersect = True
-                break
-        if not intersect:
+        # rotate image to face mouse
+        self.image, new_rect = rotation_cache.rotate(self.base_image, math.degrees(angle), self.rect.center)
+        # Check if turning around will cause the player to be stuck
+        if not self.collision_grid.rect_collides(new_rect):
             self.rect = new_rect  # adjust player rect
 
     def calc_angle(self):
-        mouse_x, mouse_y = pygame.mouse.get_pos()  # returns mouse position as a tuple (x, y)
+        mouse_x, mouse_y = self.camera.screen_to_world(self.input.get_mouse_pos())  # mouse position in the world
         # Calculate relative x and y position of mouse from player
         relative_x = mouse_x - self.rect.centerx
         relative_y = -(mouse_y - self.rect.centery)  # adjust to pygame coordinates
@@ -160,36 +166,32 @@ class Weapon:
 
         self.ammo = magazine_size  # weapon currently holds a full magazine
         self.reloading = False  # reload state
-        self.bullets_fired = pygame.sprite.Group()  # contains bullets that have been fired
 
-        # Keep track of last time a bullet was fired
-        self.last_fired = 0
+        # Keep track of last time a bullet was fired, in game time
+        self.last_fired = -math.inf
 
     def fire(self, fire_angle):
         if self.ammo == 0:
             return
-        current_time = time.time()
+        current_time = self.user.clock.time
         # New bullet fired if shot within the fire rate
         if current_time - self.last_fired >= self.fire_rate:
-            bullet = self.create_bullet(fire_angle)  # create new bullet
-            self.bullets_fired.add(bullet)  # add bullet to group
+            self.create_bullet(fire_angle)  # create new bullet
             self.ammo -= 1  # reduce weapon ammo
             self.last_fired = current_time  # update last time weapon was fired
 
     def create_bullet(self, fire_angle):
-        return Bullet(self.bullet_damage, fire_angle, start_pos=self.user.rect.center)
+        self.user.projectiles.spawn(self.user.BULLET_OWNER, self.user.rect.center, fire_angle, self.bullet_damage)
 
     def reload(self):
         # No need to reload if weapon holds a full magazine, is already reloading or user has no ammo
         if self.ammo == self.magazine_size or self.user.ammo == 0 or self.reloading:
             return
-        reload_thread = threading.Thread(target=self._reload_method)
-        reload_thread.start()
+        self.reloading = True
+        self.user.scheduler.schedule(self.reload_time, self._finish_reload)  # wait for reload time
 
     # Private method
-    def _reload_method(self):
-        self.reloading = True
-        time.sleep(self.reload_time)  # wait for reload time
+    def _finish_reload(self):
         delta_ammo = self.magazine_size - self.ammo  # ammo needed to fill weapon
         ammo_taken = min(delta_ammo, self.user.ammo)  # ammo taken from user
         self.ammo += ammo_taken
@@ -217,13 +219,12 @@ class Shotgun(Weapon):
     def fire(self, fire_angle):
         if self.ammo == 0:
             return
-        current_time = time.time()
+        current_time = self.user.clock.time
         if current_time - self.last_fired >= self.fire_rate:
             for i in range(-1, self.num_pellets - 1):  # iterates for the number of pellets
                 if self.ammo == 0:   # user may have less ammo than number of bullets fired
                     break
-                bullet = self.create_bullet(fire_angle + self.spread * i)  # create bullet at appropriate angle
-                self.bullets_fired.add(bullet)  # add bullet to group
+                self.create_bullet(fire_angle + self.spread * i)  # create bullet at appropriate angle
                 self.ammo -= 1  # reduce weapon ammo
                 self.last_fired = current_time  # update last time weapon was fired
 
@@ -234,53 +235,20 @@ class Sniper(Weapon):
         super().__init__(user, "sniper", magazine_size=1, bullet_damage=25, fire_rate=2.5, reload_time=2.5)
 
 
-class Bullet(pygame.sprite.Sprite):
-    IMAGE = pygame.image.load("sprite images/bullet.png")  # class level constant
-
-    def __init__(self, damage, fire_angle, start_pos):
-        super().__init__()
-        self.image = pygame.transform.rotate(Bullet.IMAGE.convert_alpha(), math.degrees(fire_angle))
-        self.direction = pygame.math.Vector2(math.cos(fire_angle), -math.sin(fire_angle)).normalize()  # fire direction
-
-        # Set starting position of bullet and move outwards to give appearance of emerging from weapon
-        self.rect = self.image.get_rect(center=start_pos)
-        self.rect.center += self.direction * 30
-
-        self.damage = damage
-        self.speed = 20
-
-    def update(self):
-        # Move bullet in the correct direction at the correct speed
-        self.rect.center += self.direction * self.speed
-
-    def draw(self, window):
-        window.blit(self.image, (self.rect.x, self.rect.y))
-
-
-# General tile class to be used by floors and walls
-class Tile(pygame.sprite.Sprite):
-    def __init__(self, image, x, y):
-        super().__init__()
-        self.image = image.convert_alpha()
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-    def draw(self, window):
-        window.blit(self.image, (self.rect.x, self.rect.y))
-
-
 class Chest(pygame.sprite.Sprite):
-    IMAGE = pygame.transform.scale(pygame.image.load("tiles/chest.png"), (TILE_SIZE - 40, TILE_SIZE - 40))
+    IMAGE_PATH = "tiles/chest.png"
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, rng=random):
         super().__init__()
-        self.image = Chest.IMAGE.convert_alpha()
+        self.image = assets.image(Chest.IMAGE_PATH, (TILE_SIZE - 40, TILE_SIZE - 40))
         self.rect = self.image.get_rect(center=(x + TILE_SIZE/2, y + TILE_SIZE/2))  # place in the center of tile
 
-        item_type = random.choice(["weapon", "health points", "ammo"])  # choose from different item types
+        # rng decides the item, chests created part way through a game get their own so the item doesn't depend on when
+        item_type = rng.choice(["weapon", "health points", "ammo"])  # choose from different item types
         if item_type == "weapon":
-            item_value = random.choice(["shotgun", "assault rifle"])  # choose from the available weapons
+            item_value = rng.choice(["shotgun", "assault rifle"])  # choose from the available weapons
         else:
-            item_value = random.randint(10, 80)  # random integer between 10 and 80
+            item_value = rng.randint(10, 80)  # random integer between 10 and 80
 
         self.item = Item(item_type, item_value)  # create item
 
@@ -297,17 +265,47 @@ class Item:
 
 # Game Map
 class Map:
-    def __init__(self):
-        self.array = [["w"] * MAP_WIDTH for _ in range(MAP_HEIGHT)]  # map is initially filled with walls
+    # Values stored in the map array
+    FLOOR = 0
+    WALL = 1
+    CHEST = 2
+
+    DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]  # (dy, dx) of the neighbors of a tile
+
+    def __init__(self, width=MAP_WIDTH, height=MAP_HEIGHT):
+        self.width = width  # map dimensions in tiles
+        self.height = height
+        self.array = np.full((height, width), Map.WALL, dtype=np.uint8)  # map is initially filled with walls
         self.rooms = []
-        self.graph = {}  # graph implementation as adjacency list
+        self.seed = random.getrandbits(32)  # seeds the contents of each chest
+
+        # Graph in compressed sparse row form, node ids are tile ids (y * width + x)
+        # neighbors of a tile are graph_indices[graph_indptr[tile_id]:graph_indptr[tile_id + 1]]
+        self.graph_indptr = None
+        self.graph_indices = None
+        self._graph = None  # dictionary version of the graph, only built when needed
+        self._graph_lists = None  # list version of the compressed graph, shared by the path finders
 
         # generate map
         self.generate()
 
+    @classmethod
+    def from_arrays(cls, array, rooms, seed, graph_indptr, graph_indices):
+        # Map made from saved arrays (see dungeonpack.py) instead of being generated, the arrays are used as they are
+        map = cls.__new__(cls)
+        map.height, map.width = array.shape
+        map.array = array
+        map.rooms = [pygame.Rect(room) for room in rooms.tolist()]  # rooms array has a row of x, y, width, height
+        map.seed = seed
+        map.graph_indptr = graph_indptr
+        map.graph_indices = graph_indices
+        map._graph = None
+        map._graph_lists = None
+        return map
+
     def generate(self):
-        # Random room generation
-        MAX_ROOMS = 20
+        # Random room generation, bigger maps get more rooms
+        MAX_ROOMS = 20 * self.width * self.height // (BASE_MAP_WIDTH * BASE_MAP_HEIGHT)
         for _ in range(MAX_ROOMS):
             current_room = self.generate_room()
             # Add room if it in a valid position
@@ -320,31 +318,25 @@ class Map:
         # Create graph representation of map array
         self.create_graph()
 
-    @staticmethod
-    def generate_room():
+    def generate_room(self):
         # Random generation of room position and dimensions
         MIN_SIZE = 270
         MAX_SIZE = 810
         width = random.randrange(MIN_SIZE, MAX_SIZE + 1, TILE_SIZE)
         height = random.randrange(MIN_SIZE, MAX_SIZE + 1, TILE_SIZE)
-        x = random.randrange(TILE_SIZE, MAP_WIDTH * TILE_SIZE - width - TILE_SIZE, TILE_SIZE)  # avoid map border
-        y = random.randrange(TILE_SIZE, MAP_HEIGHT * TILE_SIZE - height - TILE_SIZE, TILE_SIZE)
+        x = random.randrange(TILE_SIZE, self.width * TILE_SIZE - width - TILE_SIZE, TILE_SIZE)  # avoid map border
+        y = random.randrange(TILE_SIZE, self.height * TILE_SIZE - height - TILE_SIZE, TILE_SIZE)
         return pygame.Rect(x, y, width, height)
 
     def is_valid_room(self, room):
         # Check if room intersects with any existing rooms
-        for existing_room in self.rooms:
-            if existing_room.colliderect(room):
-                return False
-        return True
+        return room.collidelist(self.rooms) == -1
 
     def add_room(self, room):
         x_start, x_end = room.left // TILE_SIZE, room.right // TILE_SIZE
         y_start, y_end = room.top // TILE_SIZE, room.bottom // TILE_SIZE
         # Carve a rectangular room out of the walls
-        for y in range(y_start, y_end):
-            for x in range(x_start, x_end):
-                self.array[y][x] = " "  # set as floor tile
+        self.array[y_start:y_end, x_start:x_end] = Map.FLOOR
         self.rooms.append(room)
 
         # Random chest spawning
@@ -354,8 +346,8 @@ class Map:
             while True:
                 chest_x = random.randint(x_start, x_end - 1)
                 chest_y = random.randint(y_start, y_end - 1)
-                if self.array[chest_y][chest_x] == " ":
-                    self.array[chest_y][chest_x] = "c"
+                if self.array[chest_y, chest_x] == Map.FLOOR:
+                    self.array[chest_y, chest_x] = Map.CHEST
                     break
 
     def add_tunnel(self, room1, room2):
@@ -369,58 +361,251 @@ class Map:
         # Carve a horizontal tunnel between two x coordinates
         x_start, x_end = [coord // TILE_SIZE for coord in sorted([x1, x2])]
         y //= TILE_SIZE
-        for x in range(x_start, x_end + 1):  # iterates up to and including "x_end"
-            self.array[y][x] = " "
+        self.array[y, x_start:x_end + 1] = Map.FLOOR  # up to and including "x_end"
 
     def add_vertical_tunnel(self, y1, y2, x):
         # Carve a vertical tunnel between two y coordinates
         y_start, y_end = [coord // TILE_SIZE for coord in sorted([y1, y2])]
         x //= TILE_SIZE
-        for y in range(y_start, y_end + 1):
-            self.array[y][x] = " "
+        self.array[y_start:y_end + 1, x] = Map.FLOOR
 
     def create_graph(self):
-        for y in range(MAP_HEIGHT):
-            for x in range(MAP_WIDTH):
-                if self.array[y][x] != "w":
-                    # Add empty space as graph node
-                    node = ((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE)  # center of floor tile
-                    self.graph[node] = []
-                    # Check surrounding tiles
-                    for dy, dx in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                        neighbor_y, neighbor_x = y + dy, x + dx
-                        # Check if the neighbor is within the map dimensions:
-                        if (0 <= neighbor_y < MAP_HEIGHT) and (0 <= neighbor_x < MAP_WIDTH):
-                            # Add neighbor if it is an empty space
-                            if self.array[neighbor_y][neighbor_x] != "w":
-                                neighbor = ((neighbor_x + 0.5) * TILE_SIZE, (neighbor_y + 0.5) * TILE_SIZE)
-                                self.graph[node].append(neighbor)
-
-    def shift(self, camera_offset):
-        # Shift map rooms
-        for room in self.rooms:
-            room.center -= camera_offset
-        # Adjust graph data
-        for node in list(self.graph.keys()):
-            # Shift node to new position and obtain its neighbors
-            new_node = (node[0] - camera_offset.x, node[1] - camera_offset.y)
-            self.graph[new_node] = self.graph.pop(node)
-            for i, neighbor in enumerate(self.graph[new_node]):
-                self.graph[new_node][i] = (neighbor[0] - camera_offset.x, neighbor[1] - camera_offset.y)
+        # Every empty space is a graph node, connected to the empty spaces around it
+        empty = self.array != Map.WALL
+        padded = np.pad(empty, 1, constant_values=False)  # tiles outside the map count as walls
+        tile_ids = np.arange(self.width * self.height, dtype=np.int32).reshape(self.height, self.width)
+
+        # Neighbor tile id in each direction, -1 if there is no neighbor
+        neighbors = np.full((self.height, self.width, len(Map.DIRECTIONS)), -1, dtype=np.int32)
+        for i, (dy, dx) in enumerate(Map.DIRECTIONS):
+            neighbor_empty = padded[1 + dy:1 + dy + self.height, 1 + dx:1 + dx + self.width]
+            neighbors[:, :, i] = np.where(empty & neighbor_empty, tile_ids + dy * self.width + dx, -1)
+
+        # Compress into row pointers and a flat list of neighbors
+        neighbors = neighbors.reshape(-1, len(Map.DIRECTIONS))
+        has_neighbor = neighbors != -1
+        self.graph_indptr = np.zeros(len(neighbors) + 1, dtype=np.int32)
+        np.cumsum(has_neighbor.sum(axis=1), out=self.graph_indptr[1:])
+        self.graph_indices = neighbors[has_neighbor]
+        self._graph = None
+        self._graph_lists = None
+
+    @property
+    def graph_lists(self):
+        # Plain lists of the compressed graph are faster to index than numpy arrays, converted once per map
+        if self._graph_lists is None:
+            self._graph_lists = (self.graph_indptr.tolist(), self.graph_indices.tolist())
+        return self._graph_lists
+
+    @property
+    def graph(self):
+        # Adjacency list keyed by tile centers, built from the compressed graph the first time it is used
+        if self._graph is None:
+            self._graph = {}
+            indptr, indices = self.graph_lists
+            for tile_id in np.flatnonzero(self.array != Map.WALL).tolist():
+                self._graph[self.node(tile_id)] = [self.node(neighbor)
+                                                   for neighbor in indices[indptr[tile_id]:indptr[tile_id + 1]]]
+        return self._graph
+
+    def node(self, tile_id):
+        # Center of a tile in world coordinates
+        y, x = divmod(tile_id, self.width)
+        return (x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE
+
+    @staticmethod
+    def tile_at(pos):
+        # Map column and row containing a world position
+        return int(pos[0] // TILE_SIZE), int(pos[1] // TILE_SIZE)
+
+    def tile_id(self, pos):
+        # Id of the tile containing a world position, None if the tile is not part of the graph
+        x, y = self.tile_at(pos)
+        if 0 <= x < self.width and 0 <= y < self.height and self.array[y, x] != Map.WALL:
+            return y * self.width + x
+        return None
+
+    def node_at(self, pos):
+        # Graph node of the tile containing a world position
+        tile_id = self.tile_id(pos)
+        return None if tile_id is None else self.node(tile_id)
+
+
+# Game camera
+class Camera:
+    def __init__(self):
+        # Everything stays in world coordinates, the camera offset is only applied when drawing
+        self.offset = pygame.math.Vector2()
+        self.rect = pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)  # area of the world that is visible
+
+    def follow(self, target, alpha=1):
+        # Center the camera on the target
+        self.rect.center = self.interpolate(target, alpha).center
+        self.offset.update(self.rect.topleft)
+
+    @staticmethod
+    def interpolate(sprite, alpha):
+        # Position of a moving sprite between its last two simulation steps, alpha of 1 is its current position
+        if alpha == 1:
+            return sprite.rect
+        previous_x, previous_y = sprite.previous_center
+        return sprite.rect.move((previous_x - sprite.rect.centerx) * (1 - alpha),
+                                (previous_y - sprite.rect.centery) * (1 - alpha))
+
+    def apply(self, rect):
+        # Screen position of a rect in world coordinates
+        return rect.move(-self.offset.x, -self.offset.y)
+
+    def world_to_screen(self, pos):
+        return pos[0] - self.offset.x, pos[1] - self.offset.y
+
+    def screen_to_world(self, pos):
+        return pos[0] + self.offset.x, pos[1] + self.offset.y
+
+    def is_visible(self, rect):
+        return self.rect.colliderect(rect)
+
+    def draw(self, window, sprite_group, alpha=1):
+        # Only draw the sprites that are on screen
+        for sprite in sprite_group:
+            rect = self.interpolate(sprite, alpha)
+            if self.rect.colliderect(rect):
+                window.blit(sprite.image, self.apply(rect))
+
+
+# Floors and walls never change, so they are baked into large chunk surfaces instead of being drawn tile by tile
+class StaticLayer:
+    def __init__(self, map):
+        self.map = map
+        self.chunk_pixels = CHUNK_SIZE * TILE_SIZE  # width and height of a chunk surface
+        self.chunks = OrderedDict()  # baked chunk surfaces, least recently drawn first
+        self.memory_used = 0  # bytes used by the baked chunks
+
+        # Tiles are opaque so the asset manager converts them without alpha for faster blits
+        floor_image = assets.image("tiles/floor.png", (TILE_SIZE, TILE_SIZE))
+        self.tile_images = {
+            Map.FLOOR: floor_image,
+            Map.WALL: assets.image("tiles/wall.png", (TILE_SIZE, TILE_SIZE)),
+            Map.CHEST: floor_image,  # chests are drawn separately on top of the floor
+        }
+
+    def get_chunk(self, chunk_x, chunk_y):
+        chunk = self.chunks.get((chunk_x, chunk_y))
+        if chunk is None:
+            chunk = self.bake_chunk(chunk_x, chunk_y)
+            self.chunks[(chunk_x, chunk_y)] = chunk
+            self.memory_used += self.surface_bytes(chunk)
+            # Drop the least recently drawn chunks to stay within the memory budget, they are baked again if needed
+            while self.memory_used > CHUNK_CACHE_BYTES and len(self.chunks) > 1:
+                _, old_chunk = self.chunks.popitem(last=False)
+                self.memory_used -= self.surface_bytes(old_chunk)
+        else:
+            self.chunks.move_to_end((chunk_x, chunk_y))
+        return chunk
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+    def bake_chunk(self, chunk_x, chunk_y):
+        # Draw every tile of the chunk onto a single surface
+        x_start, y_start = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        tiles = self.map.array[y_start:y_start + CHUNK_SIZE, x_start:x_start + CHUNK_SIZE]
+        chunk = pygame.Surface((tiles.shape[1] * TILE_SIZE, tiles.shape[0] * TILE_SIZE)).convert()
+        chunk.blits([(self.tile_images[tile], (x * TILE_SIZE, y * TILE_SIZE))
+                     for (y, x), tile in np.ndenumerate(tiles)], doreturn=False)
+        return chunk
+
+    def draw(self, window, camera):
+        # Only the chunks overlapping the camera are drawn, which is at most a handful of blits
+        x_start = max(0, camera.rect.left // self.chunk_pixels)
+        y_start = max(0, camera.rect.top // self.chunk_pixels)
+        x_end = min((self.map.width - 1) // CHUNK_SIZE, (camera.rect.right - 1) // self.chunk_pixels)
+        y_end = min((self.map.height - 1) // CHUNK_SIZE, (camera.rect.bottom - 1) // self.chunk_pixels)
+        for chunk_y in range(y_start, y_end + 1):
+            for chunk_x in range(x_start, x_end + 1):
+                chunk_pos = (chunk_x * self.chunk_pixels, chunk_y * self.chunk_pixels)
+                window.blit(self.get_chunk(chunk_x, chunk_y), camera.world_to_screen(chunk_pos))
+
+
+# Chests only exist as sprites in the chunks around the player, they are created and removed as the player moves
+class ChestLayer:
+    def __init__(self, map, chest_group):
+        self.map = map
+        self.chest_group = chest_group  # chests of the loaded chunks, used for drawing and collisions
+        self.chunks = {}  # chests of each loaded chunk
+        self.center_chunk = None  # chunk the player was last in
+        self.num_chunks = ((map.width - 1) // CHUNK_SIZE + 1, (map.height - 1) // CHUNK_SIZE + 1)
+
+    def update(self, pos):
+        # Nothing changes until the player moves into a different chunk
+        center_chunk = (int(pos[0]) // (CHUNK_SIZE * TILE_SIZE), int(pos[1]) // (CHUNK_SIZE * TILE_SIZE))
+        if center_chunk == self.center_chunk:
+            return
+        self.center_chunk = center_chunk
+
+        x_range = range(max(0, center_chunk[0] - ACTIVE_CHUNK_RADIUS),
+                        min(self.num_chunks[0], center_chunk[0] + ACTIVE_CHUNK_RADIUS + 1))
+        y_range = range(max(0, center_chunk[1] - ACTIVE_CHUNK_RADIUS),
+                        min(self.num_chunks[1], center_chunk[1] + ACTIVE_CHUNK_RADIUS + 1))
+        active = {(chunk_x, chunk_y) for chunk_x in x_range for chunk_y in y_range}
+
+        # Unload chunks the player has left and load the ones they are approaching
+        for chunk in [chunk for chunk in self.chunks if chunk not in active]:
+            for chest in self.chunks.pop(chunk):
+                chest.kill()
+        for chunk in active:
+            if chunk not in self.chunks:
+                self.chunks[chunk] = self.load_chunk(*chunk)
+
+    def load_chunk(self, chunk_x, chunk_y):
+        x_start, y_start = chunk_x * CHUNK_SIZE, chunk_y * CHUNK_SIZE
+        tiles = self.map.array[y_start:y_start + CHUNK_SIZE, x_start:x_start + CHUNK_SIZE]
+        chests = []
+        for y, x in np.argwhere(tiles == Map.CHEST).tolist():
+            x, y = x_start + x, y_start + y
+            # Same item every time the chunk is loaded
+            chest = Chest(x * TILE_SIZE, y * TILE_SIZE, random.Random(self.map.seed + y * self.map.width + x))
+            chests.append(chest)
+            self.chest_group.add(chest)
+        return chests
+
+    def open(self, chest):
+        # Opened chests are removed from the map so they are not created again
+        x, y = Map.tile_at(chest.rect.center)
+        self.map.array[y, x] = Map.FLOOR
+        chest.kill()
+        self.chunks[(x // CHUNK_SIZE, y // CHUNK_SIZE)].remove(chest)
 
 
 class Enemy(pygame.sprite.Sprite):
-    IMAGE = pygame.image.load("sprite images/zombie.png")
+    IMAGE_PATH = "sprite images/zombie.png"
+    BULLET_OWNER = ProjectileSystem.ENEMY
 
-    def __init__(self, x, y, target, map, floor_tiles):
+    def __init__(self, x, y, game):
         super().__init__()
-        self.target = target  # enemies will target the player
-        self.map = map  # load map data
-        self.floor_tiles = floor_tiles  # keep track of dungeon floor
+        self.target = game.player  # enemies will target the player
+        self.map = game.map  # load map data
+        self.flow_field = game.flow_field  # shared paths towards the player
+        self.astar = game.astar  # shared A* search engine
+        self.path_cache = PathCache(self.astar)  # path to the player kept between frames
+        self.projectiles = game.projectiles  # fired bullets are added here
+        self.clock = game.sim_clock  # game time for weapons
+        self.scheduler = game.scheduler  # delayed actions such as finishing a reload
+        self.perception = game.perception  # line of sight checks
 
         # Sprite setup
-        self.image = self.original_image = self.IMAGE.convert_alpha()
+        self.base_image = assets.image(self.IMAGE_PATH)  # unrotated image
+        self.image = self.base_image
         self.rect = self.image.get_rect(topleft=(x, y))
+        self.previous_center = self.rect.center  # position before the last simulation step, for drawing
+
+        # Distance and angle to the player and level of detail, set at the start of every step by the game
+        self.target_distance = math.inf
+        self.target_angle = 0
+        self.lod_tier = AILevelOfDetail.NEAR
+        self.followed_path = []  # next few nodes, used by mid and far enemies between path lookups
+        self.repath_countdown = 0  # steps until the path is looked up again
 
         # Enemy attributes
         self.health = 40
@@ -461,74 +646,78 @@ class Enemy(pygame.sprite.Sprite):
             self.kill()
             return
 
-        self.move()
+        # Far away enemies only walk along the path they already have
+        if self.lod_tier == AILevelOfDetail.FAR:
+            self.follow_path(AI_FAR_REPATH_STEPS)
+            return
+        if self.lod_tier == AILevelOfDetail.MID:
+            self.follow_path(AI_MID_REPATH_STEPS)
+        else:
+            self.followed_path = []
+            self.move()
         self.rotate()
-        # Shoot at player if in range
-        if math.dist(self.rect.center, self.target.rect.center) <= self.range:
+        # Shoot at player if in range and not behind a wall
+        if self.target_distance <= self.range and self.perception.can_see(self.rect.center, self.target.rect.center):
             self.shoot()
 
     def move(self):
-        path = self.calculate_path()
-        # First node is the start, so check if there is a path beyond it
-        if len(path) >= 2:
-            # Move the enemy within their speed
-            next_node = pygame.math.Vector2(path[1])
-            move_vector = next_node - self.rect.center
-            if move_vector.magnitude() <= self.speed:
-                self.rect.center = next_node
-            else:
-                direction = move_vector.normalize()
-                self.rect.center += direction * self.speed
+        # Next step towards the player is looked up in the shared flow field
+        next_node = self.flow_field.next_node(self.rect.center)
+        if next_node is None and not self.flow_field.reaches(self.rect.center):
+            # Too far from the player for the flow field, follow an A* path instead
+            path = self.calculate_path()
+            next_node = path[1] if len(path) > 1 else None
+        if next_node is not None:
+            self.move_towards(next_node)
+
+    def follow_path(self, repath_steps):
+        # Path is only looked up every few steps, the enemy keeps walking along its nodes in between
+        self.repath_countdown -= 1
+        if self.repath_countdown <= 0 or not self.followed_path:
+            self.followed_path = self.lookahead_path()
+            self.repath_countdown = repath_steps
+        if self.followed_path and self.move_towards(self.followed_path[0]):
+            self.followed_path.pop(0)
+
+    def lookahead_path(self):
+        # Next AI_PATH_LOOKAHEAD nodes towards the player
+        if not self.flow_field.reaches(self.rect.center):
+            return self.calculate_path()[1:AI_PATH_LOOKAHEAD + 1]
+        nodes = []
+        node = self.rect.center
+        for _ in range(AI_PATH_LOOKAHEAD):
+            node = self.flow_field.next_node(node)
+            if node is None:
+                break
+            nodes.append(node)
+        return nodes
+
+    def move_towards(self, node):
+        # Move the enemy within their speed, returns True once the node is reached
+        node = pygame.math.Vector2(node)
+        move_vector = node - self.rect.center
+        if move_vector.magnitude() <= self.speed:
+            self.rect.center = node
+            return True
+        direction = move_vector.normalize()
+        self.rect.center += direction * self.speed
+        return False
 
     def calculate_path(self):
-        def heuristic(coord1, coord2):
-            # Manhattan distance heuristic
-            x1, y1 = coord1
-            x2, y2 = coord2
-            return abs(x1 - x2) + abs(y1 - y2)
-
         # Find floor tile occupied by player and enemy
-        found_start = found_goal = False
-        for floor in self.floor_tiles:
-            if floor.rect.collidepoint(self.rect.center):
-                start = floor.rect.center
-                found_start = True
-            if floor.rect.collidepoint(self.target.rect.center):
-                goal = floor.rect.center
-                found_goal = True
-            if found_start and found_goal:
-                break  # no longer need to search
-
-        heap = [(0, start, [])]  # add start node's info to heap
-        visited = set()
-
-        # Iterate while heap is not empty
-        while heap:
-            # pop node with smallest f score from heap
-            current_f_score, current_node, path = heapq.heappop(heap)
-
-            # Return path to goal if reached
-            if current_node == goal:
-                return path + [current_node]
-
-            # Calculate cost to current node
-            current_g_score = current_f_score - heuristic(current_node, goal)
-
-            # Check neighbors of current node
-            for neighbor in self.map.graph[current_node]:
-                # Can only check neighbors that haven't already been visited
-                if neighbor not in visited:
-                    g_score = current_g_score + 1  # distance between neighbors will always be 1 tile
-                    f_score = g_score + heuristic(neighbor, goal)
-                    heapq.heappush(heap, (f_score, neighbor, path + [current_node]))
-
-            visited.add(current_node)  # mark node as visited
+        start = self.map.tile_id(self.rect.center)
+        goal = self.map.tile_id(self.target.rect.center)
+        if start is None or goal is None:
+            return []
+
+        # Cached path is reused or repaired when possible, otherwise A* is run again
+        path = self.path_cache.get_path(start, goal)
+        return [self.map.node(tile_id) for tile_id in path]
 
     def rotate(self):
         # Rotate to face player
-        facing_angle = self.angle_to_player()
-        self.image = pygame.transform.rotate(self.original_image, math.degrees(facing_angle))
-        self.rect = self.image.get_rect(center=self.rect.center)
+        facing_angle = self.target_angle
+        self.image, self.rect = rotation_cache.rotate(self.base_image, math.degrees(facing_angle), self.rect.center)
 
     def shoot(self):
         if self.weapon.reloading:
@@ -538,7 +727,7 @@ class Enemy(pygame.sprite.Sprite):
             self.weapon.reload()
             return
 
-        angle_to_player = self.angle_to_player()
+        angle_to_player = self.target_angle
 
         # Calculate uncertainty of shooting angle
         max_uncertainty = math.radians(10)  # maximum uncertainty value
@@ -548,12 +737,6 @@ class Enemy(pygame.sprite.Sprite):
         shooting_angle = random.uniform(angle_to_player - uncertainty, angle_to_player + uncertainty)
         self.weapon.fire(shooting_angle)
 
-    def angle_to_player(self):
-        return math.atan2(
-            -(self.target.rect.centery - self.rect.centery),
-            self.target.rect.centerx - self.rect.centerx
-            )
-
     def take_damage(self, damage):
         self.health = max(0, self.health - damage)  # health reduced no lower than 0
 
@@ -562,20 +745,20 @@ class Enemy(pygame.sprite.Sprite):
 
 
 class ShotgunEnemy(Enemy):
-    IMAGE = pygame.image.load("sprite images/shotgun zombie.png")
+    IMAGE_PATH = "sprite images/shotgun zombie.png"
 
-    def __init__(self, x, y, target, map, floor_tiles):
-        super().__init__(x, y, target, map, floor_tiles)
+    def __init__(self, x, y, game):
+        super().__init__(x, y, game)
         self.weapon = Shotgun(self)
         self.weapon.bullet_damage = 4
         self.range = 200  # close firing range
 
 
 class SniperEnemy(Enemy):
-    IMAGE = pygame.image.load("sprite images/sniper zombie.png")
+    IMAGE_PATH = "sprite images/sniper zombie.png"
 
-    def __init__(self, x, y, target, map, floor_tiles):
-        super().__init__(x, y, target, map, floor_tiles)
+    def __init__(self, x, y, game):
+        super().__init__(x, y, game)
         self.weapon = Sniper(self)
         self.range = 350  # longer firing range
         self.accuracy = 0.8  # high accuracy
@@ -0,0 +1,58 @@
+# Runs the game without a display or a player, as fast as possible, and reports the simulation speed
+# Usage: python headless.py --frames 10000 --seed 1 [--render] [--fps 60] [--speed 2] [--profile frames.csv]
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # no window is opened
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import time
+import pygame
+from settings import *
+from inputs import RandomInput
+
+
+def run_headless(frames, seed=None, render=False, fps=0, speed=1, profile=None):
+    pygame.init()
+    pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))  # dummy display, needed to convert images
+    from game import Game
+
+    game = Game(input_source=RandomInput(seed), render=render, fps=fps, seed=seed, time_scale=speed)
+    if profile:
+        game.profiler.toggle()
+    start = time.perf_counter()
+    score = game.run(max_frames=frames)
+    seconds = time.perf_counter() - start
+    if profile:
+        game.profiler.dump(profile)
+
+    return {
+        "frames": game.frame_count,
+        "seconds": seconds,
+        "fps": game.frame_count / seconds,
+        "level": game.level,
+        "score": score,
+        "player_alive": game.player.alive,
+        "profile": game.profiler.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the game headless and report simulated frames per second")
+    parser.add_argument("--frames", type=int, default=10000, help="frames to simulate (stops early if the player dies)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the map, enemies and input")
+    parser.add_argument("--render", action="store_true", help="draw every frame to the dummy display")
+    parser.add_argument("--fps", type=int, default=0, help="frame rate cap, 0 for uncapped")
+    parser.add_argument("--profile", help="time every frame and save the last frames to this .csv or .json file")
+    parser.add_argument("--speed", type=float, default=1,
+                        help="game time per real second when the frame rate is capped")
+    args = parser.parse_args()
+
+    result = run_headless(args.frames, args.seed, args.render, args.fps, args.speed, args.profile)
+    print(f"Simulated {result['frames']} frames in {result['seconds']:.2f}s ({result['fps']:.0f} frames per second)")
+    print(f"Level {result['level']}, score {result['score']}, player {'alive' if result['player_alive'] else 'dead'}")
+    for phase, (p50, p95, p99) in result["profile"].items():
+        print(f"{phase:>10}  p50 {p50:.3f} ms  p95 {p95:.3f} ms  p99 {p99:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
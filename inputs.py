@@ -0,0 +1,58 @@
+import random
+import pygame
+from settings import *
+
+
+# Keyboard and mouse input read from pygame, used when a person is playing
+class PygameInput:
+    def get_events(self):
+        return pygame.event.get()
+
+    def get_pressed(self):
+        return pygame.key.get_pressed()
+
+    def get_mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+
+# Indexed by key like the list returned by pygame.key.get_pressed()
+class KeyState:
+    def __init__(self, keys_held):
+        self.keys_held = keys_held
+
+    def __getitem__(self, key):
+        return key in self.keys_held
+
+
+# Randomly generated input for running the game without a player, the same seed always gives the same input
+class RandomInput:
+    MOVE_KEYS = [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d]
+
+    def __init__(self, seed=None, change_every=30, shots_per_second=4):
+        self.random = random.Random(seed)
+        self.change_every = change_every  # frames before choosing new keys and a new mouse position
+        self.shot_chance = shots_per_second / FPS  # chance of clicking each frame
+        self.frame = 0
+        self.keys_held = set()
+        self.mouse_pos = (WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2)
+
+    def get_events(self):
+        # Called once per frame, so this is where the input changes
+        pygame.event.pump()  # keep the event queue from filling up
+        events = []
+        if self.frame % self.change_every == 0:
+            self.keys_held = {key for key in RandomInput.MOVE_KEYS if self.random.random() < 0.3}
+            self.mouse_pos = (self.random.randrange(WINDOW_WIDTH), self.random.randrange(WINDOW_HEIGHT))
+            # Sometimes reload or switch weapon
+            key = self.random.choice([RELOAD_KEY] + INVENTORY_KEYS)
+            events.append(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=pygame.key.name(key)))
+        if self.random.random() < self.shot_chance:
+            events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=self.mouse_pos))
+        self.frame += 1
+        return events
+
+    def get_pressed(self):
+        return KeyState(self.keys_held)
+
+    def get_mouse_pos(self):
+        return self.mouse_pos
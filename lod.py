@@ -0,0 +1,47 @@
+import pygame
+import numpy as np
+from settings import *
+
+
+# Sorts enemies into detail tiers by how close they are to the player, far away enemies do less work every step
+class AILevelOfDetail:
+    NEAR = 0  # full update every step
+    MID = 1  # path looked up every AI_MID_REPATH_STEPS
+    FAR = 2  # path looked up every AI_FAR_REPATH_STEPS, no rotating
+
+    def __init__(self, map):
+        self.map = map
+        self.target_room = None  # room the player was last found in
+        self.counts = [0, 0, 0]  # enemies in each tier after the last update
+
+    def update(self, enemies, target, perception):
+        # Enemies must be in the same order as when the perception was updated
+        if len(perception.distances) == 0:
+            self.counts = [0, 0, 0]
+            return
+
+        # Tier from the distances worked out by the perception
+        centers, distances = perception.centers, perception.distances
+        tiers = np.where(distances <= AI_NEAR_DISTANCE, self.NEAR,
+                         np.where(distances <= AI_MID_DISTANCE, self.MID, self.FAR))
+
+        # Enemies sharing a room with the target can see it, so they are always near
+        room = self.find_room(target.rect.center)
+        if room is not None:
+            in_room = ((centers[:, 0] >= room.left) & (centers[:, 0] < room.right) &
+                       (centers[:, 1] >= room.top) & (centers[:, 1] < room.bottom))
+            tiers[in_room] = self.NEAR
+
+        for enemy, tier in zip(enemies, tiers.tolist()):
+            enemy.lod_tier = tier
+        self.counts = np.bincount(tiers, minlength=3).tolist()
+
+    def find_room(self, pos):
+        # The target usually stays in the same room, so that one is checked first
+        if self.target_room is not None and self.target_room.collidepoint(pos):
+            return self.target_room
+        index = pygame.Rect(pos, (1, 1)).collidelist(self.map.rooms)
+        if index == -1:
+            return None  # in a tunnel
+        self.target_room = self.map.rooms[index]
+        return self.target_room
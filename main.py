@@ -1,10 +1,12 @@
 import pygame
 import sys
-import random
+import os
+import importlib
+from concurrent.futures import ThreadPoolExecutor
 from settings import *
 from GUIs import *
 from accounts import UserData
-from gameobjects import *
+from assets import assets
 
 
 class Application:
@@ -13,46 +15,92 @@ class Application:
         # general setup
         self.window = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
         pygame.display.set_caption(GAME_TITLE)
+        self.clock = pygame.time.Clock()
 
-        # Initialise all the page objects
-        self.signInPage = SignInPage()
-        self.menu = Menu()
-        self.controlsPage = ControlsPage()
-        self.leaderboardPage = LeaderboardPage()
+        # Connect to database, the leaderboard page shares this connection
+        self.userData = UserData()
 
-        # Create dictionary matching "current_page" values to page objects
-        self.pages = {
-            "sign in": self.signInPage,
-            "menu": self.menu,
-            "controls": self.controlsPage,
-            "leaderboard": self.leaderboardPage
+        # Only the sign in page is created at startup, the others are created the first time they are opened
+        self.signInPage = SignInPage()
+        self.pages = {"sign in": self.signInPage}  # "current_page" values matched to page objects
+        self.page_types = {
+            "menu": Menu,
+            "controls": ControlsPage,
+            "leaderboard": lambda: LeaderboardPage(self.userData)
         }
         self.current_page = "sign in"  # sign in page is opened first by default
 
-        # Connect to database
-        self.userData = UserData()
+        # Game modules and images are loaded in the background once the sign in page is showing
+        self.preloader = None
+        self.game_module = None  # future of the imported game module
         # Set the game as not yet started
         self.game_started = False
 
     def run(self):
         # Stay in the pre-game until the game has started
+        # Nothing happens on the pages without input, so the loop sleeps until there is an event
+        drawn_page = None  # page currently shown on the window
         while not self.game_started:
-            self.check_events()
-            self.pages[self.current_page].draw(self.window)  # matching page is drawn to the window
-            pygame.display.update()
+            events = self.wait_for_events()
+            if any(event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE) for event in events):
+                drawn_page = None  # window contents were lost
+            self.check_events(events)
+
+            page = self.get_page(self.current_page)
+            if page is not drawn_page:
+                page.draw(self.window)  # matching page is drawn to the window
+                pygame.display.update()
+                drawn_page = page
+                if self.preloader is None:
+                    self.start_preload()  # first page is showing, load everything else while the user signs in
+            else:
+                # Same page as before, only the parts that changed are drawn and sent to the display
+                changed = page.redraw(self.window)
+                if changed:
+                    pygame.display.update(changed)
+            self.clock.tick(MENU_FPS)  # restrict redraws while the user is typing or moving the mouse
 
         # Running the game
-        game = Game()
+        game = self.create_game()
         score = game.run()
 
-        # Update user score and leaderboard then return to menu
+        # Update user score then return to menu, the score is saved in the background and the leaderboard page
+        # picks it up once it has been committed
         self.userData.update_highscore(score)
-        self.leaderboardPage.update()
         self.game_started = False
         self.run()
 
-    def check_events(self):
-        for event in pygame.event.get():
+    def get_page(self, name):
+        page = self.pages.get(name)
+        if page is None:
+            page = self.pages[name] = self.page_types[name]()
+        return page
+
+    def start_preload(self):
+        # Imports the game and decodes the images used after signing in on background threads
+        self.preloader = ThreadPoolExecutor(PRELOAD_WORKERS, thread_name_prefix="preload")
+        self.game_module = self.preloader.submit(importlib.import_module, "game")
+        assets.preload(self.preload_paths(), self.preloader)
+
+    @staticmethod
+    def preload_paths():
+        paths = list(PRELOAD_IMAGES)
+        for folder in PRELOAD_FOLDERS:
+            paths += [os.path.join(folder, file) for file in sorted(os.listdir(folder)) if file.endswith(".png")]
+        return paths
+
+    def create_game(self):
+        if self.preloader is None:
+            self.start_preload()
+        Game = self.game_module.result().Game  # waits if the game is still being imported
+        return Game()
+
+    def wait_for_events(self):
+        # Blocks until at least one event arrives, then takes every other event waiting in the queue
+        return [pygame.event.wait()] + pygame.event.get()
+
+    def check_events(self, events):
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
@@ -75,20 +123,21 @@ class Application:
 
                 # Check for interactions with menu page
                 elif self.current_page == "menu":
-                    if self.menu.playBtn.is_clicked():
+                    menu = self.get_page("menu")
+                    if menu.playBtn.is_clicked():
                         self.game_started = True
-                    elif self.menu.controlsBtn.is_clicked():
+                    elif menu.controlsBtn.is_clicked():
                         self.current_page = "controls"
-                    elif self.menu.leaderboardBtn.is_clicked():
+                    elif menu.leaderboardBtn.is_clicked():
                         self.current_page = "leaderboard"
-                    elif self.menu.signOutBtn.is_clicked():
+                    elif menu.signOutBtn.is_clicked():
                         self.current_page = "sign in"
                         self.userData.current_user = None  # no user logged in
 
                 # Check for interactions with leaderboard/controls page
                 elif self.current_page == "controls" or self.current_page == "leaderboard":
                     # Clicking the back button takes us to the menu
-                    if self.pages[self.current_page].backBtn.is_clicked():
+                    if self.get_page(self.current_page).backBtn.is_clicked():
                         self.current_page = "menu"
 
     def handle_registration(self):
@@ -126,209 +175,6 @@ class Application:
             self.signInPage.set_message("Username or password does not match")
 
 
-class Game:
-    def __init__(self):
-        # General setup
-        self.window = pygame.display.get_surface()
-        self.clock = pygame.time.Clock()
-
-        # Hide the mouse and initialise the crosshair
-        pygame.mouse.set_visible(False)
-        self.crosshair = Crosshair()
-
-        # Game sprite groups
-        self.dynamic_sprites = pygame.sprite.Group()  # contains sprites that are moving and updating
-        self.obstacle_sprites = pygame.sprite.Group()  # contains map obstacles
-        self.chest_sprites = pygame.sprite.Group()  # contains map chest
-
-        # Enemy management
-        self.enemy_sprites = pygame.sprite.Group()
-        self.enemy_bullets = pygame.sprite.Group()
-
-        # Map
-        self.map = Map()
-        self.floor_tiles = pygame.sprite.Group()
-
-        # Game variables
-        self.level = 1
-        self.player_score = 0
-
-        # Time variables
-        self.elapsed_time = 0
-        self.last_min = 0
-
-        # Create player and add to group
-        self.player = Player(self.obstacle_sprites)
-        self.dynamic_sprites.add(self.player)
-
-        self.HUD = GameHUD(self)  # Initialise heads up display
-        self.screenTransitions = ScreenTransitions()
-
-    def run(self):
-        self.generate_dungeon()
-        while self.player.alive:
-            self.check_events()
-            self.camera_scroll()
-            self.handle_collisions()
-            self.draw()
-            self.update()
-
-        # Return score after game finishes running
-        self.screenTransitions.game_over(self.window, self.player_score)
-        return self.player_score
-
-    def generate_dungeon(self):
-        # Translate game map into corresponding objects
-        self.player.rect.center = self.map.rooms[0].center  # player spawns in the middle of the first room
-        for y in range(MAP_HEIGHT):
-            for x in range(MAP_WIDTH):
-                if self.map.array[y][x] == "w":  # wall already takes up the whole tile space
-                    self.obstacle_sprites.add(Tile(WALL_IMAGE, x * TILE_SIZE, y * TILE_SIZE))
-                else:
-                    # Add a floor tile and check if there should be a chest in that position
-                    self.floor_tiles.add(Tile(FLOOR_IMAGE, x * TILE_SIZE, y * TILE_SIZE))
-                    if self.map.array[y][x] == "c":
-                        self.chest_sprites.add(Chest(x * TILE_SIZE, y * TILE_SIZE))
-        self.spawn_enemies()
-
-    def check_events(self):
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            # Player only needs to deal with mouse and keyboard presses
-            elif event.type == pygame.MOUSEBUTTONDOWN or event.type == pygame.KEYDOWN:
-                self.player.handle_event(event)
-
-    def camera_scroll(self):
-        screen_center = pygame.math.Vector2(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
-        camera_offset = self.player.rect.center - screen_center  # calculate offset of player from middle of the screen
-        self.player.rect.center = screen_center  # keep the player at the screen center
-
-        # Adjust map data
-        self.map.shift(camera_offset)
-
-        # Shift game sprites to keep at same position relative to player
-        for sprite_group in (self.dynamic_sprites, self.floor_tiles, self.obstacle_sprites, self.chest_sprites):
-            for sprite in sprite_group:
-                if sprite != self.player:
-                    sprite.rect.center -= camera_offset
-
-    def handle_collisions(self):
-        # Bullet-obstacle collision deletes bullet
-        pygame.sprite.groupcollide(self.player.bullets_fired, self.obstacle_sprites, True, False)
-        pygame.sprite.groupcollide(self.enemy_bullets, self.obstacle_sprites, True, False)
-
-        # Player-chest collisions
-        chests_collided = pygame.sprite.spritecollide(self.player, self.chest_sprites, True)
-        for chest in chests_collided:
-            self.player.handle_item(chest.item)
-
-        # Player collision with enemy bullet
-        bullets_collided = pygame.sprite.spritecollide(self.player, self.enemy_bullets, True)
-        for bullet in bullets_collided:
-            self.player.take_damage(bullet.damage)
-
-        # Enemy collision with player bullet
-        collisions_dict = pygame.sprite.groupcollide(self.enemy_sprites, self.player.bullets_fired, False, True)
-        for enemy, bullets_collided in collisions_dict.items():
-            for bullet in bullets_collided:
-                enemy.take_damage(bullet.damage)
-
-    def draw(self):
-        # Fill the window and draw the map floor
-        self.window.fill("burlywood")
-        self.floor_tiles.draw(self.window)
-
-        # Draw game sprites
-        self.obstacle_sprites.draw(self.window)
-        self.chest_sprites.draw(self.window)
-        self.dynamic_sprites.draw(self.window)
-
-        # Draw enemy health bars
-        for enemy in self.enemy_sprites:
-            pygame.draw.rect(self.window, "red", enemy.max_healthbar)
-            pygame.draw.rect(self.window, "green", enemy.healthbar)
-
-        # Draw heads up display and crosshair
-        self.HUD.draw(self.window)
-        self.crosshair.draw(self.window)
-
-    def update(self):
-        # Player score update
-        self.update_score()
-
-        # Add new bullets fired
-        for enemy in self.enemy_sprites:
-            self.enemy_bullets.add(enemy.weapon.bullets_fired)
-        self.dynamic_sprites.add(self.player.bullets_fired, self.enemy_bullets)
-
-        # Spawn new enemies after all are killed
-        if len(self.enemy_sprites) == 0:
-            self.level += 1
-            # New dungeon generated every 5 levels
-            if self.level % 5 == 0:
-                self.new_dungeon()
-            else:
-                self.spawn_enemies()
-
-        # Display update
-        self.crosshair.update()
-        self.dynamic_sprites.update()
-        pygame.display.update()
-        self.clock.tick(FPS)  # restrict frame rate
-
-    def update_score(self):
-        # Update score for every minute passed
-        self.elapsed_time += self.clock.get_time()  # update elapsed time
-        current_min = self.elapsed_time // 60000  # convert from milliseconds to the current minute
-        if current_min > self.last_min:
-            self.player_score += MINUTE_POINTS  # increment score
-            self.last_min = current_min  # update to the next minute
-
-        # Update score for enemy eliminations
-        for enemy in self.enemy_sprites:
-            if not enemy.is_alive():
-                self.player_score += ELIM_POINTS
-
-    def spawn_enemies(self):
-        # Default enemy spawned in the first level
-        if self.level == 1:
-            num_enemies = 1
-            enemyClass = Enemy
-        else:
-            num_enemies = random.randint(3, 5)  # 3 to 5 enemies spawned per wave
-            enemyClass = random.choice([Enemy, ShotgunEnemy, SniperEnemy])  # enemy type chosen randomly
-
-        occupied_rooms = []
-        # Add the player's current room to the list of occupied rooms
-        for room in self.map.rooms:
-            if room.collidepoint(self.player.rect.center):
-                occupied_rooms.append(room)
-                break
-
-        # Spawn enemies in different rooms
-        for _ in range(num_enemies):
-            room = random.choice(self.map.rooms)
-            # Make sure room is not occupied
-            while room in occupied_rooms:
-                room = random.choice(self.map.rooms)
-            occupied_rooms.append(room)
-            spawn_x, spawn_y = room.center
-            enemy = enemyClass(spawn_x, spawn_y, self.player, self.map, self.floor_tiles)  # create instance of enemy
-            enemy.set_difficulty(self.level)
-            self.enemy_sprites.add(enemy)
-            self.dynamic_sprites.add(enemy)
-
-    def new_dungeon(self):
-        self.screenTransitions.new_dungeon(self.window)
-        level, score = self.level, self.player_score
-        self.__init__()
-        self.level, self.player_score = level, score
-        self.generate_dungeon()
-
-
 # Running the program
 if __name__ == "__main__":
     app = Application()
@@ -0,0 +1,169 @@
+import heapq
+from collections import deque
+from settings import *
+
+
+# Distance field shared by every enemy, all enemies are heading towards the same goal (the player)
+# Only tiles within FLOW_FIELD_RADIUS of the goal are covered, so rebuilding it costs the same on any map size
+class FlowField:
+    def __init__(self, map, target):
+        self.map = map  # map graph is searched
+        self.target = target  # goal of the flow field
+        self.goal = None  # tile id of the goal
+        self.distances = [-1] * (map.width * map.height)  # number of tiles between each tile and the goal
+        self.covered = []  # tiles given a distance by the last build
+        self.expansions = 0  # tiles expanded by every build, read and reset by the frame profiler
+
+        self.indptr, self.indices = map.graph_lists
+
+    def update(self):
+        # Field only has to be rebuilt when the target moves to a different tile
+        goal = self.map.tile_id(self.target.rect.center)
+        if goal != self.goal and goal is not None:
+            self.goal = goal
+            self.build()
+
+    def build(self):
+        # Breadth first search outwards from the goal, every edge is 1 tile long
+        indptr, indices = self.indptr, self.indices
+        distances = self.distances
+        for tile_id in self.covered:
+            distances[tile_id] = -1  # -1 for tiles that can't reach the goal or are too far away
+        distances[self.goal] = 0
+        covered = [self.goal]
+        queue = deque([self.goal])
+        expanded = 0
+        while queue:
+            tile_id = queue.popleft()
+            distance = distances[tile_id] + 1
+            if distance > FLOW_FIELD_RADIUS:
+                continue
+            expanded += 1
+            for neighbor in indices[indptr[tile_id]:indptr[tile_id + 1]]:
+                if distances[neighbor] == -1:
+                    distances[neighbor] = distance
+                    covered.append(neighbor)
+                    queue.append(neighbor)
+        self.covered = covered
+        self.expansions += expanded
+
+    def reaches(self, pos):
+        # True if the position is covered by the field
+        tile_id = self.map.tile_id(pos)
+        return tile_id is not None and self.distances[tile_id] != -1
+
+    def next_node(self, pos):
+        # Neighbor of the current node that is closest to the goal
+        tile_id = self.map.tile_id(pos)
+        if tile_id is None or self.distances[tile_id] <= 0:
+            return None  # goal can't be reached or has already been reached
+        distance = self.distances[tile_id]
+        for neighbor in self.indices[self.indptr[tile_id]:self.indptr[tile_id + 1]]:
+            if self.distances[neighbor] == distance - 1:
+                return self.map.node(neighbor)
+
+
+# A* search over integer tile ids, tile id = y * map width + x
+class AStar:
+    def __init__(self, map):
+        self.map = map
+        self.width = map.width
+        num_tiles = map.width * map.height
+
+        # Compressed graph from the map, walls have no neighbors
+        self.indptr, self.indices = map.graph_lists
+
+        # Search tables are reused between searches, entries only count if stamped with the current search number
+        self.search_num = 0
+        self.g_scores = [0] * num_tiles  # best known cost to each tile
+        self.parents = [-1] * num_tiles  # previous tile on the best known path
+        self.seen = [0] * num_tiles  # search number when a tile was last given a g score
+        self.closed = [0] * num_tiles  # search number when a tile was last expanded
+        self.expansions = 0  # tiles expanded by every search, read and reset by the frame profiler
+
+    def neighbors(self, tile_id):
+        return self.indices[self.indptr[tile_id]:self.indptr[tile_id + 1]]
+
+    def search(self, start, goal):
+        self.search_num += 1
+        search_num = self.search_num
+        width = self.width
+        goal_y, goal_x = divmod(goal, width)
+        indptr, indices = self.indptr, self.indices
+        g_scores, parents, seen, closed = self.g_scores, self.parents, self.seen, self.closed
+
+        g_scores[start] = 0
+        parents[start] = -1
+        seen[start] = search_num
+        start_y, start_x = divmod(start, width)
+        h_score = abs(start_x - goal_x) + abs(start_y - goal_y)  # manhattan distance in tiles
+        heap = [(h_score, h_score, start)]  # ties are broken by the node closest to the goal
+
+        while heap:
+            _, _, current = heapq.heappop(heap)
+            # Nodes may be pushed more than once, only the first pop is expanded
+            if closed[current] == search_num:
+                continue
+            closed[current] = search_num
+            self.expansions += 1
+
+            if current == goal:
+                return self.reconstruct(goal)
+
+            g_score = g_scores[current] + 1  # distance between neighbors will always be 1 tile
+            for neighbor in indices[indptr[current]:indptr[current + 1]]:
+                if closed[neighbor] == search_num:
+                    continue
+                # Only push a neighbor if this is the best path found to it so far
+                if seen[neighbor] != search_num or g_score < g_scores[neighbor]:
+                    seen[neighbor] = search_num
+                    g_scores[neighbor] = g_score
+                    parents[neighbor] = current
+                    y, x = divmod(neighbor, width)
+                    h_score = abs(x - goal_x) + abs(y - goal_y)
+                    heapq.heappush(heap, (g_score + h_score, h_score, neighbor))
+        return None  # goal can't be reached
+
+    def reconstruct(self, goal):
+        # Follow parent pointers back from the goal
+        path = [goal]
+        parent = self.parents[goal]
+        while parent != -1:
+            path.append(parent)
+            parent = self.parents[parent]
+        path.reverse()
+        return path
+
+
+# Path kept by a single enemy between frames
+class PathCache:
+    MAX_REPAIRS = 8  # repaired paths drift from the shortest path, so search again after this many repairs
+
+    def __init__(self, astar):
+        self.astar = astar
+        self.path = []  # tile ids from the current position to the goal
+        self.repairs = 0
+
+    def get_path(self, start, goal):
+        # Goal moved since the path was found, try fixing the end of the path before searching again
+        if self.path and self.path[-1] != goal and not self.repair(goal):
+            self.path = []
+
+        # Reuse the cached path if we are still on it
+        if start in self.path:
+            del self.path[:self.path.index(start)]
+        else:
+            self.path = self.astar.search(start, goal) or []
+            self.repairs = 0
+        return self.path
+
+    def repair(self, goal):
+        if self.repairs >= PathCache.MAX_REPAIRS or goal not in self.astar.neighbors(self.path[-1]):
+            return False
+        # Goal moved back along the path or one tile further away
+        if len(self.path) >= 2 and self.path[-2] == goal:
+            self.path.pop()
+        else:
+            self.path.append(goal)
+        self.repairs += 1
+        return True
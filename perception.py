@@ -0,0 +1,75 @@
+import math
+import numpy as np
+from collections import OrderedDict
+from settings import *
+
+
+# What every enemy knows about the player, worked out for all enemies at once at the start of each step
+class Perception:
+    def __init__(self, collision_grid):
+        self.walls = collision_grid.walls
+        self.width = collision_grid.width
+        self.height = collision_grid.height
+        self.centers = np.zeros((0, 2))  # enemy centers
+        self.distances = np.zeros(0)  # distance from each enemy to the target
+        self.sight_cache = OrderedDict()  # (enemy tile, target tile) -> line of sight, least recently used first
+
+    def update(self, enemies, target):
+        # Distance and angle to the target for every enemy in one go, stored on the enemies
+        enemies = list(enemies)
+        self.centers = np.array([enemy.rect.center for enemy in enemies], dtype=float).reshape(-1, 2)
+        dx = target.rect.centerx - self.centers[:, 0]
+        dy = target.rect.centery - self.centers[:, 1]
+        self.distances = np.hypot(dx, dy)
+        angles = np.arctan2(-dy, dx)  # screen y points down, angles are measured anticlockwise
+        for enemy, distance, angle in zip(enemies, self.distances.tolist(), angles.tolist()):
+            enemy.target_distance = distance
+            enemy.target_angle = angle
+
+    def can_see(self, start, end):
+        # Line of sight between two world positions, walls never change so results are kept per pair of tiles
+        start_tile = (int(start[0] // TILE_SIZE), int(start[1] // TILE_SIZE))
+        end_tile = (int(end[0] // TILE_SIZE), int(end[1] // TILE_SIZE))
+        key = (start_tile, end_tile)
+        visible = self.sight_cache.get(key)
+        if visible is None:
+            visible = self.sight_cache[key] = self.raycast(start_tile, end_tile)
+            if len(self.sight_cache) > SIGHT_CACHE_SIZE:
+                self.sight_cache.popitem(last=False)
+        else:
+            self.sight_cache.move_to_end(key)
+        return visible
+
+    def raycast(self, start_tile, end_tile):
+        # Walks the grid from the center of the start tile to the center of the end tile (DDA), one tile at a time
+        x, y = start_tile
+        end_x, end_y = end_tile
+        if not (0 <= x < self.width and 0 <= y < self.height and 0 <= end_x < self.width and 0 <= end_y < self.height):
+            return False
+        dx, dy = end_x - x, end_y - y
+        step_x, step_y = (1 if dx > 0 else -1), (1 if dy > 0 else -1)
+
+        # Distance along the ray, as a fraction of its length, to cross one tile and to reach the next tile edge
+        delta_x = 1 / abs(dx) if dx else math.inf
+        delta_y = 1 / abs(dy) if dy else math.inf
+        next_x, next_y = delta_x / 2, delta_y / 2
+
+        walls = self.walls
+        while (x, y) != (end_x, end_y):
+            if next_x < next_y:
+                x += step_x
+                next_x += delta_x
+            elif next_y < next_x:
+                y += step_y
+                next_y += delta_y
+            else:
+                # Ray passes exactly through a corner, it is blocked if either tile beside the corner is a wall
+                if walls[y, x + step_x] or walls[y + step_y, x]:
+                    return False
+                x += step_x
+                y += step_y
+                next_x += delta_x
+                next_y += delta_y
+            if walls[y, x]:
+                return False
+        return True
@@ -0,0 +1,72 @@
+import csv
+import json
+import time
+from collections import deque
+import numpy as np
+from settings import *
+
+
+# Times each phase of a frame and keeps the most recent frames for percentile stats, does nothing while disabled
+class FrameProfiler:
+    PHASES = ["events", "wait", "collisions", "update", "camera", "draw", "display"]
+    COUNTS = ["enemies", "entities", "bullets", "path_expansions", "ai_near", "ai_mid", "ai_far"]
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.enabled = False
+        self.frames = deque(maxlen=window)  # one record per frame, oldest frames are dropped
+        self.frame_num = 0  # frames recorded since the game started
+        self.frame_start = 0
+        self.phase_times = dict.fromkeys(FrameProfiler.PHASES, 0)  # nanoseconds spent in each phase this frame
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frames.clear()  # stats restart each time the profiler is turned on
+        self.begin_frame()  # profiler is toggled part way through a frame
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter_ns()
+        for phase in self.phase_times:
+            self.phase_times[phase] = 0
+
+    def measure(self, phase, function, *args):
+        # Calls function and adds its run time to the phase, a phase may be measured several times per frame
+        if not self.enabled:
+            return function(*args)
+        start = time.perf_counter_ns()
+        result = function(*args)
+        self.phase_times[phase] += time.perf_counter_ns() - start
+        return result
+
+    def end_frame(self, counts):
+        # counts holds the number of entities, bullets and path expansions in this frame
+        self.frame_num += 1
+        record = {"frame": self.frame_num, "total": time.perf_counter_ns() - self.frame_start}
+        record.update(self.phase_times)
+        record.update(counts)
+        self.frames.append(record)
+
+    def stats(self):
+        # p50, p95 and p99 in milliseconds of the whole frame and each phase over the recorded frames
+        if not self.frames:
+            return {}
+        stats = {}
+        for key in ["total"] + FrameProfiler.PHASES:
+            times = np.fromiter((frame[key] for frame in self.frames), dtype=np.int64, count=len(self.frames))
+            stats[key] = tuple((np.percentile(times, (50, 95, 99)) / 1e6).tolist())
+        return stats
+
+    def latest_counts(self):
+        if not self.frames:
+            return dict.fromkeys(FrameProfiler.COUNTS, 0)
+        return {key: self.frames[-1][key] for key in FrameProfiler.COUNTS}
+
+    def dump(self, path=PROFILE_DUMP_FILE):
+        # Save the recorded frames for offline analysis, times are in nanoseconds
+        fields = ["frame", "total"] + FrameProfiler.PHASES + FrameProfiler.COUNTS
+        with open(path, "w", newline="") as file:
+            if path.endswith(".json"):
+                json.dump({"fields": fields, "frames": list(self.frames)}, file)
+            else:
+                writer = csv.DictWriter(file, fields)
+                writer.writeheader()
+                writer.writerows(self.frames)
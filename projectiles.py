@@ -0,0 +1,125 @@
+import math
+import numpy as np
+from settings import *
+from rotation import rotation_cache
+from assets import assets
+
+
+# All live bullets are stored in preallocated arrays (one row per bullet) and updated together
+class ProjectileSystem:
+    IMAGE_PATH = "sprite images/bullet.png"
+
+    # Who fired a bullet, player bullets hit enemies and enemy bullets hit the player
+    PLAYER = 0
+    ENEMY = 1
+
+    SPEED = 20
+    MUZZLE_DISTANCE = 30  # bullets start this far from the shooter to give the appearance of emerging from the weapon
+
+    def __init__(self, collision_grid, capacity=256):
+        self.collision_grid = collision_grid
+        self.image = assets.image(self.IMAGE_PATH)  # every bullet shares the same image
+        self.count = 0  # live bullets are always kept in the first "count" rows
+
+        self.positions = np.zeros((capacity, 2))  # bullet centers
+        self.velocities = np.zeros((capacity, 2))
+        self.half_sizes = np.zeros((capacity, 2))  # half width and height of the rotated bullet image
+        self.angles = np.zeros(capacity)  # fire angle in degrees
+        self.damage = np.zeros(capacity)
+        self.owners = np.zeros(capacity, dtype=np.int8)
+
+    def spawn(self, owner, start_pos, fire_angle, damage):
+        if self.count == len(self.positions):
+            self.grow()
+        i = self.count
+        direction_x, direction_y = math.cos(fire_angle), -math.sin(fire_angle)
+        self.positions[i] = (start_pos[0] + direction_x * self.MUZZLE_DISTANCE,
+                             start_pos[1] + direction_y * self.MUZZLE_DISTANCE)
+        self.velocities[i] = (direction_x * self.SPEED, direction_y * self.SPEED)
+
+        # Size of the bounding box of the rotated image
+        width, height = self.image.get_size()
+        self.half_sizes[i] = ((abs(direction_x) * width + abs(direction_y) * height) / 2,
+                              (abs(direction_y) * width + abs(direction_x) * height) / 2)
+        self.angles[i] = math.degrees(fire_angle)
+        self.damage[i] = damage
+        self.owners[i] = owner
+        self.count += 1
+
+    def grow(self):
+        # Double the capacity of every array, only happens when more bullets are alive than ever before
+        for name in ("positions", "velocities", "half_sizes", "angles", "damage", "owners"):
+            array = getattr(self, name)
+            new_array = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+            new_array[:self.count] = array[:self.count]
+            setattr(self, name, new_array)
+
+    def remove(self, dead):
+        # Remove bullets by moving the surviving rows to the front, no objects are created or destroyed
+        alive = ~dead
+        survivors = int(alive.sum())
+        if survivors == self.count:
+            return
+        for array in (self.positions, self.velocities, self.half_sizes, self.angles, self.damage, self.owners):
+            array[:survivors] = array[:self.count][alive]
+        self.count = survivors
+
+    def update(self):
+        # Move every bullet in one step
+        self.positions[:self.count] += self.velocities[:self.count]
+
+    def collide_walls(self):
+        # Bullet-wall collision deletes bullet, checks the corners of each bullet's bounding box
+        if self.count == 0:
+            return
+        positions, half_sizes = self.positions[:self.count], self.half_sizes[:self.count]
+        walls = self.collision_grid.walls
+        height, width = walls.shape
+        top_left = np.floor((positions - half_sizes) / TILE_SIZE).astype(int)
+        bottom_right = np.floor((positions + half_sizes - 0.001) / TILE_SIZE).astype(int)  # edges are not in the rect
+        dead = np.zeros(self.count, dtype=bool)
+        for tile_x, tile_y in ((top_left[:, 0], top_left[:, 1]), (bottom_right[:, 0], top_left[:, 1]),
+                               (top_left[:, 0], bottom_right[:, 1]), (bottom_right[:, 0], bottom_right[:, 1])):
+            outside = (tile_x < 0) | (tile_y < 0) | (tile_x >= width) | (tile_y >= height)  # outside counts as wall
+            dead |= outside
+            inside = ~outside
+            dead[inside] |= walls[tile_y[inside], tile_x[inside]]
+        self.remove(dead)
+
+    def collide_rects(self, owner, rects):
+        # Returns (rect index, damage) for bullets from "owner" that hit one of the rects, those bullets are deleted
+        if self.count == 0 or len(rects) == 0:
+            return []
+        rects = np.array([(rect.centerx, rect.centery, rect.width / 2, rect.height / 2) for rect in rects])
+        candidates = np.flatnonzero(self.owners[:self.count] == owner)
+        positions, half_sizes = self.positions[candidates], self.half_sizes[candidates]
+
+        # Overlap test between every bullet and every rect at once
+        overlap = ((np.abs(positions[:, None, 0] - rects[None, :, 0]) < half_sizes[:, None, 0] + rects[None, :, 2]) &
+                   (np.abs(positions[:, None, 1] - rects[None, :, 1]) < half_sizes[:, None, 1] + rects[None, :, 3]))
+        hit = overlap.any(axis=1)
+        if not hit.any():
+            return []
+        rect_indexes = overlap[hit].argmax(axis=1)  # a bullet only damages the first rect it hits
+        hits = list(zip(rect_indexes.tolist(), self.damage[candidates[hit]].tolist()))
+
+        dead = np.zeros(self.count, dtype=bool)
+        dead[candidates[hit]] = True
+        self.remove(dead)
+        return hits
+
+    def draw(self, window, camera, alpha=1):
+        if self.count == 0:
+            return
+        # Bullets are drawn between their last two positions, only bullets on screen are drawn
+        screen_positions = (self.positions[:self.count] - self.velocities[:self.count] * (1 - alpha)
+                            - (camera.offset.x, camera.offset.y))
+        x, y = screen_positions[:, 0], screen_positions[:, 1]
+        on_screen = np.flatnonzero((x > -TILE_SIZE) & (x < WINDOW_WIDTH + TILE_SIZE) &
+                                   (y > -TILE_SIZE) & (y < WINDOW_HEIGHT + TILE_SIZE))
+        blits = [rotation_cache.rotate(self.image, angle, center)
+                 for center, angle in zip(screen_positions[on_screen].tolist(), self.angles[on_screen].tolist())]
+        window.blits(blits, doreturn=False)
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,30 @@
+import pygame
+from settings import *
+
+
+# Rotated copies of sprite images, shared by every sprite using the same image
+class RotationCache:
+    def __init__(self, steps=ROTATION_STEPS):
+        self.steps = steps  # number of angles a full turn is split into
+        self.frames = {}  # (image, step) -> (rotated image, offset of the top left corner from the center)
+
+    def get_frame(self, image, step):
+        frame = self.frames.get((image, step))
+        if frame is None:
+            rotated = pygame.transform.rotate(image, step * 360 / self.steps).convert_alpha()
+            width, height = rotated.get_size()
+            frame = self.frames[(image, step)] = (rotated, width // 2, height // 2)
+        return frame
+
+    def rotate(self, image, angle, center):
+        # Returns the image rotated by "angle" degrees and its rect placed at the center
+        rotated, offset_x, offset_y = self.get_frame(image, round(angle * self.steps / 360) % self.steps)
+        return rotated, pygame.Rect(center[0] - offset_x, center[1] - offset_y, *rotated.get_size())
+
+    def prewarm(self, image):
+        # Build every angle ahead of time
+        for step in range(self.steps):
+            self.get_frame(image, step)
+
+
+rotation_cache = RotationCache()  # one cache for the whole game
@@ -1,10 +1,14 @@
 import pygame
+from assets import assets
 
 # Program Settings
 GAME_TITLE = "Dungeon Destruction"
 WINDOW_WIDTH = 1080
 WINDOW_HEIGHT = 720
 FPS = 60
+MENU_FPS = 30  # most redraws per second of the pages before the game
+SIMULATION_RATE = 60  # fixed simulation steps per second, speeds are in pixels per step
+MAX_CATCH_UP_STEPS = 5  # most steps simulated before a frame is drawn
 BG_COLOUR = "gray"
 
 
@@ -21,22 +25,52 @@ ELIM_POINTS = 10
 
 # Map dimensions
 TILE_SIZE = 90
-MAP_WIDTH = WINDOW_WIDTH * 5 // TILE_SIZE
-MAP_HEIGHT = WINDOW_HEIGHT * 5 // TILE_SIZE
+BASE_MAP_WIDTH = WINDOW_WIDTH * 5 // TILE_SIZE  # original dungeon size of 5 by 5 screens, 20 rooms are tried in it
+BASE_MAP_HEIGHT = WINDOW_HEIGHT * 5 // TILE_SIZE
+DUNGEON_SCALE = 5  # dungeon width and height in multiples of the original size (25 times the area)
+MAP_WIDTH = BASE_MAP_WIDTH * DUNGEON_SCALE
+MAP_HEIGHT = BASE_MAP_HEIGHT * DUNGEON_SCALE
+CHUNK_SIZE = 8  # width and height in tiles of the pre-drawn map chunks
+CHUNK_CACHE_BYTES = 48 * 1024 * 1024  # memory budget of the pre-drawn chunk surfaces
+ACTIVE_CHUNK_RADIUS = 2  # chests are only created in chunks this close to the player's chunk
+FLOW_FIELD_RADIUS = 40  # tiles from the player covered by the flow field, enemies further away use A*
+SPAWN_ROOM_CHOICES = 10  # enemies spawn in one of the rooms closest to the player
 
-# Image preload
-FLOOR_IMAGE = pygame.transform.scale(pygame.image.load("tiles/floor.png"), (TILE_SIZE, TILE_SIZE))
-WALL_IMAGE = pygame.transform.scale(pygame.image.load("tiles/wall.png"), (TILE_SIZE, TILE_SIZE))
+# Enemy AI level of detail, enemies further from the player are updated less often
+AI_NEAR_DISTANCE = 800  # enemies this close or in the player's room are fully updated every step
+AI_MID_DISTANCE = 2000  # enemies this close look up their path every AI_MID_REPATH_STEPS, further ones are far
+AI_MID_REPATH_STEPS = 10
+AI_FAR_REPATH_STEPS = 60  # far enemies also stop rotating
+AI_PATH_LOOKAHEAD = 4  # nodes followed by mid and far enemies between path lookups
+SIGHT_CACHE_SIZE = 4096  # line of sight results kept for pairs of enemy and player tiles
+
+# Sprite rotation
+ROTATION_STEPS = 360  # rotated sprite images are cached for this many angles
+
+# Text rendering
+TEXT_CACHE_SIZE = 256  # rendered text surfaces kept for reuse
+
+# Frame profiler
+PROFILER_KEY = pygame.K_F3  # shows and hides the frame timing overlay
+PROFILE_DUMP_KEY = pygame.K_F4  # saves the recorded frames to PROFILE_DUMP_FILE
+PROFILE_DUMP_FILE = "frame_profile.csv"  # .csv or .json
+PROFILE_WINDOW = 600  # most recent frames kept for the stats
+PROFILE_REFRESH = 30  # frames between overlay updates
+
+# Startup, everything not needed by the sign in page is loaded in the background while it is open
+PRELOAD_WORKERS = 4  # threads decoding images
+PRELOAD_FOLDERS = ["buttons", "icons", "sprite images", "tiles"]  # every image in these folders is preloaded
+PRELOAD_IMAGES = ["controls.png", "crosshair.png"]
 
 
 # Mouse Crosshair
 class Crosshair:
     def __init__(self):
-        self.image = pygame.image.load("crosshair.png").convert_alpha()
+        self.image = assets.image("crosshair.png")
         self.rect = self.image.get_rect()
 
-    def update(self):
-        self.rect.center = pygame.mouse.get_pos()
+    def update(self, mouse_pos):
+        self.rect.center = mouse_pos
 
     def draw(self, window):
         window.blit(self.image, (self.rect.x, self.rect.y))
@@ -0,0 +1,67 @@
+import heapq
+from settings import *
+
+
+# Game time advances in fixed steps, so gameplay is the same no matter how fast frames are drawn
+class SimulationClock:
+    def __init__(self, time_scale=1):
+        self.step = 1 / SIMULATION_RATE  # seconds of game time per simulation step
+        self.time_scale = time_scale  # above 1 runs the game faster than real time, below 1 slower
+        self.time = 0  # seconds of game time that have been simulated
+        self.accumulator = 0  # real time waiting to be simulated
+        self.steps = 0  # total number of steps taken
+
+    def advance(self, real_seconds):
+        # Returns how many steps are needed to catch up with the time that has passed
+        self.accumulator += real_seconds * self.time_scale
+        steps = int(self.accumulator // self.step)
+        if steps > MAX_CATCH_UP_STEPS:
+            # Too far behind (e.g. the window was dragged), drop the extra time instead of freezing to catch up
+            steps = MAX_CATCH_UP_STEPS
+            self.accumulator = self.step * steps
+        self.accumulator -= self.step * steps
+        return steps
+
+    def tick(self):
+        # Called once at the end of every simulation step
+        self.time += self.step
+        self.steps += 1
+
+    def get_alpha(self):
+        # How far the display is between the last step and the next one, used to interpolate positions
+        return self.accumulator / self.step
+
+
+# Delayed actions (e.g. finishing a reload) waiting in a heap until the game clock reaches their due time
+class Scheduler:
+    def __init__(self, clock):
+        self.clock = clock
+        self.timers = []  # heap of (due time, order scheduled, timer)
+        self.count = 0  # timers due at the same time run in the order they were scheduled
+
+    def schedule(self, delay, callback, *args):
+        # Call callback(*args) once "delay" seconds of game time have passed, returns a timer that can be cancelled
+        timer = Timer(callback, args)
+        heapq.heappush(self.timers, (self.clock.time + delay, self.count, timer))
+        self.count += 1
+        return timer
+
+    def update(self):
+        # Run every timer that is due, called once per simulation step
+        while self.timers and self.timers[0][0] <= self.clock.time:
+            timer = heapq.heappop(self.timers)[2]
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+
+    def __len__(self):
+        return len(self.timers)
+
+
+class Timer:
+    def __init__(self, callback, args):
+        self.callback = callback
+        self.args = args
+        self.cancelled = False  # cancelled timers stay in the heap but are skipped when due
+
+    def cancel(self):
+        self.cancelled = True